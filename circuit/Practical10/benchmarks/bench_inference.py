@@ -0,0 +1,77 @@
+"""Micro-benchmark: sklearn estimator.predict vs CompiledModel.predict.
+
+    python benchmarks/bench_inference.py [--model web_service/model.pkl]
+
+Only the predict call itself is timed, on a float64 ndarray that is already
+built, so request parsing, label lookup and JSON encoding in the web_service
+are not included. The compiled side is loaded back from an .npz file, the
+same way MODEL_PATH=model.npz serves it. Each figure is the best of five
+repeats, divided by the number of calls in a repeat.
+"""
+import os
+import sys
+import json
+import pickle
+import timeit
+import argparse
+import tempfile
+
+import numpy as np
+
+WEB_SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'web_service')
+sys.path.insert(0, WEB_SERVICE_DIR)
+
+from compiled_model import CompiledModel, compile_model  # noqa: E402
+
+
+def time_call(fn, number):
+    best = min(timeit.repeat(fn, number=number, repeat=5))
+    return best / number
+
+
+def run(model_path, batch_sizes):
+    with open(model_path, 'rb') as f:
+        estimator = pickle.load(f)
+    with tempfile.TemporaryDirectory() as tmp:
+        npz_path = os.path.join(tmp, 'model.npz')
+        np.savez(npz_path, **compile_model(estimator))
+        compiled = CompiledModel.load(npz_path)
+    rng = np.random.default_rng(0)
+
+    results = []
+    for batch_size in batch_sizes:
+        X = rng.uniform(0.0, 8.0, size=(batch_size, estimator.n_features_in_))
+        assert np.array_equal(compiled.predict(X), estimator.predict(X))
+        number = max(10, 20000 // batch_size)
+        sklearn_s = time_call(lambda: estimator.predict(X), number)
+        compiled_s = time_call(lambda: compiled.predict(X), number)
+        results.append({
+            "batch_size": batch_size,
+            "sklearn_us": sklearn_s * 1e6,
+            "compiled_us": compiled_s * 1e6,
+            "speedup": sklearn_s / compiled_s
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default=os.path.join(WEB_SERVICE_DIR, 'model.pkl'))
+    parser.add_argument('--batch-sizes', default='1,32,1024')
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args()
+
+    results = run(args.model, [int(n) for n in args.batch_sizes.split(',')])
+
+    print(f"{'batch':>8} {'sklearn (us)':>14} {'compiled (us)':>14} {'speedup':>8}")
+    for row in results:
+        print(f"{row['batch_size']:>8} {row['sklearn_us']:>14.1f} "
+              f"{row['compiled_us']:>14.1f} {row['speedup']:>7.1f}x")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""Caller latency through ``handle_db_failure`` before, during and after a
+db_service outage.
+
+Runs the fake db_service in-process and calls it through the web service's
+``handle_db_failure`` wrapper, once with the default consecutive-failure
+``pybreaker.CircuitBreaker`` as a baseline and once with the
+``SlidingWindowCircuitBreaker``. Reset timeouts are skipped instead of
+slept through, so a full open -> half-open -> closed cycle takes seconds:
+
+    python benchmarks/breaker_benchmark.py --outage errors
+    python benchmarks/breaker_benchmark.py --outage hang --timeout 0.2
+    python benchmarks/breaker_benchmark.py --breakers sliding_window
+
+The sliding-window breaker reads a virtual clock that is moved forward.
+pybreaker reads the real clock, so its recorded opened_at is moved back by
+the same amount instead.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+import pybreaker
+import requests
+
+from harness import (FEATURE_NAMES, WEB_SERVICE_DIR, VirtualClock, feature_rows,
+                     quiet_logging, start_fake_db_service, summarize)
+
+sys.path.insert(0, WEB_SERVICE_DIR)
+import circuit_breaker  # noqa: E402
+from circuit_breaker import SlidingWindowCircuitBreaker, handle_db_failure  # noqa: E402
+
+OUTAGES = {
+    "errors": {"error_rate": 1.0},
+    "slow": {"latency": 0.15},
+    "hang": {"hang_rate": 1.0, "hang_seconds": 5.0},
+    "flaky": {"error_rate": 0.6}
+}
+HEALTHY = {"error_rate": 0.0, "latency": 0.0, "hang_rate": 0.0}
+
+
+class StateRecorder:
+    def __init__(self, clock):
+        self.clock = clock
+        self.started = clock()
+        self.transitions = []
+
+    def before_call(self, cb, func, *args, **kwargs):
+        pass
+
+    def success(self, cb):
+        pass
+
+    def failure(self, cb, exc):
+        pass
+
+    def state_change(self, cb, old_state, new_state):
+        # pybreaker passes None as old_state for the initial state.
+        if old_state is None:
+            return
+        self.transitions.append({
+            "at_seconds": round(self.clock() - self.started, 3),
+            "from": old_state.name,
+            "to": new_state.name
+        })
+
+
+def outcome_of(result):
+    if isinstance(result, dict) and result.get("status") in ("degraded", "error"):
+        return result["status"]
+    return "ok"
+
+
+def run_phase(save, calls, concurrency):
+    def timed(i):
+        start = time.perf_counter()
+        result = save(i)
+        return time.perf_counter() - start, outcome_of(result)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, range(calls)))
+    elapsed = time.perf_counter() - started
+
+    outcomes = {}
+    for _, outcome in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    stats = summarize([latency for latency, _ in results], 0, elapsed)
+    for key in ("errors", "degraded", "fallback", "unhealthy_fraction", "ok_per_second"):
+        del stats[key]
+    stats["outcomes"] = outcomes
+    for outcome in ("ok", "degraded", "error"):
+        latencies = sorted(latency for latency, o in results if o == outcome)
+        if latencies:
+            stats[f"{outcome}_p50_ms"] = latencies[len(latencies) // 2] * 1000
+    return stats
+
+
+def make_breaker(kind, args, clock, recorder):
+    """Build the breaker under test and a function that skips ``seconds`` of
+    its reset timeout."""
+    if kind == "consecutive":
+        # Same settings as make_db_circuit_breaker's default mode.
+        breaker = pybreaker.CircuitBreaker(
+            fail_max=3, reset_timeout=args.reset_timeout, exclude=[ValueError],
+            listeners=[recorder], name="db_service_breaker")
+
+        def skip(seconds):
+            clock.advance(seconds)
+            storage = breaker._state_storage
+            if seconds and storage.opened_at is not None:
+                storage.opened_at = storage.opened_at - timedelta(seconds=seconds)
+        return breaker, skip
+
+    breaker = SlidingWindowCircuitBreaker(
+        window_size=20, minimum_calls=10, failure_rate_threshold=0.5,
+        slow_call_rate_threshold=0.5, slow_call_duration=args.slow_call_seconds,
+        reset_timeout=args.reset_timeout, half_open_max_calls=3,
+        exclude=[ValueError], listeners=[recorder], clock=clock,
+        name="db_service_breaker")
+    return breaker, clock.advance
+
+
+BREAKERS = ("consecutive", "sliding_window")
+
+
+def run_breaker(kind, args, faults, server, rows):
+    clock = VirtualClock()
+    recorder = StateRecorder(clock)
+    breaker, skip = make_breaker(kind, args, clock, recorder)
+    circuit_breaker.db_circuit_breaker = breaker
+
+    # requests.Session is not thread-safe, so each caller thread gets its own.
+    local = threading.local()
+    sessions = []
+    sessions_lock = threading.Lock()
+
+    def thread_session():
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+            with sessions_lock:
+                sessions.append(session)
+        return session
+
+    @handle_db_failure
+    def save_to_database(i):
+        data = dict(zip(FEATURE_NAMES, rows[i % len(rows)]), predicted_class="Setosa")
+        response = thread_session().post(f"{server.url}/record", data=data,
+                                         timeout=(args.timeout, args.timeout))
+        response.raise_for_status()
+        return response.json()
+
+    # (phase, faults, seconds of reset timeout to skip before the phase)
+    phases = [
+        ("before", HEALTHY, 0),
+        ("outage", OUTAGES[args.outage], 0),
+        ("outage_after_reset", OUTAGES[args.outage], args.reset_timeout),
+        ("recovery", HEALTHY, args.reset_timeout),
+        ("after", HEALTHY, 0)
+    ]
+    results = {"phases": {}}
+    try:
+        for name, phase_faults, advance in phases:
+            skip(advance)
+            faults.update(**phase_faults)
+            stats = run_phase(save_to_database, args.calls, args.concurrency)
+            stats["breaker_state"] = breaker.current_state
+            results["phases"][name] = stats
+            print(f"{kind:>14} {name:>18}: p50 {stats['p50_ms']:7.2f} ms  "
+                  f"p99 {stats['p99_ms']:7.2f} ms  {stats['outcomes']}  "
+                  f"breaker {stats['breaker_state']}")
+    finally:
+        for session in sessions:
+            session.close()
+    results["transitions"] = recorder.transitions
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--outage', choices=sorted(OUTAGES), default="errors")
+    parser.add_argument('--breakers', default=",".join(BREAKERS),
+                        help=f"comma-separated, from {', '.join(BREAKERS)}")
+    parser.add_argument('--calls', type=int, default=200, help="calls per phase")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--timeout', type=float, default=0.25,
+                        help="client read timeout in seconds")
+    parser.add_argument('--reset-timeout', type=float, default=30)
+    parser.add_argument('--slow-call-seconds', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="results file (default: benchmarks/results/breaker-<timestamp>.json)")
+    args = parser.parse_args()
+
+    # The injected failures are expected; keep their log lines out of the report.
+    quiet_logging(logging.ERROR)
+    faults, server = start_fake_db_service(seed=args.seed)
+    rows = feature_rows(args.calls, args.seed)
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "outage": args.outage,
+        "faults": OUTAGES[args.outage],
+        "calls_per_phase": args.calls,
+        "concurrency": args.concurrency,
+        "client_timeout": args.timeout,
+        "breakers": {}
+    }
+    try:
+        for kind in args.breakers.split(','):
+            if kind not in BREAKERS:
+                parser.error(f"unknown breaker {kind!r}")
+            results["breakers"][kind] = run_breaker(kind, args, faults, server, rows)
+    finally:
+        server.stop()
+
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'results',
+        time.strftime("breaker-%Y%m%d-%H%M%S") + '.json')
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""In-memory stand-in for db_service with fault injection.
+
+Serves the same /record, /record/bulk and /health routes as db_service, but
+keeps records in memory and can be told to fail. Faults apply to the /record
+routes and are read from the environment at startup, then changed at runtime
+with ``PUT /faults``:
+
+    error_rate    fraction of requests answered with a 503
+    latency       seconds added to every request
+    hang_rate     fraction of requests that hang for ``hang_seconds``
+
+    FAKE_DB_ERROR_RATE=0.5 python benchmarks/fake_db_service.py
+    curl -X PUT -H 'Content-Type: application/json' \
+         -d '{"error_rate": 1.0}' http://localhost:5001/faults
+"""
+import os
+import time
+import random
+import logging
+import threading
+
+from flask import Flask, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+FEATURE_NAMES = ['sepal_length', 'sepal_width', 'petal_length', 'petal_width']
+FAULT_NAMES = ("error_rate", "latency", "hang_rate", "hang_seconds")
+
+
+class FaultConfig:
+    def __init__(self, error_rate=0.0, latency=0.0, hang_rate=0.0, hang_seconds=30.0,
+                 seed=None, sleep=time.sleep):
+        self.error_rate = error_rate
+        self.latency = latency
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.sleep = sleep
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.injected = {"errors": 0, "hangs": 0}
+
+    def update(self, **faults):
+        unknown = set(faults) - set(FAULT_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown faults: {', '.join(sorted(unknown))}")
+        with self._lock:
+            for name, value in faults.items():
+                setattr(self, name, float(value))
+
+    def snapshot(self):
+        with self._lock:
+            return dict({name: getattr(self, name) for name in FAULT_NAMES},
+                        injected=dict(self.injected))
+
+    def apply(self):
+        """Delay or hang the current request. Returns True when it should fail."""
+        with self._lock:
+            hang = self._random.random() < self.hang_rate
+            fail = not hang and self._random.random() < self.error_rate
+            delay = self.latency + (self.hang_seconds if hang else 0.0)
+            if hang:
+                self.injected["hangs"] += 1
+            if fail:
+                self.injected["errors"] += 1
+        if delay:
+            self.sleep(delay)
+        return fail
+
+
+def create_app(faults=None):
+    app = Flask(__name__)
+    faults = faults or FaultConfig()
+    records = []
+    records_lock = threading.Lock()
+    app.config["FAULTS"] = faults
+
+    def store(rows):
+        with records_lock:
+            start = len(records) + 1
+            for offset, row in enumerate(rows):
+                records.append(dict(row, id=start + offset))
+            return list(range(start, start + len(rows)))
+
+    def parse(data):
+        return dict({name: float(data[name]) for name in FEATURE_NAMES},
+                    predicted_class=data["predicted_class"])
+
+    @app.before_request
+    def inject_faults():
+        if request.path.startswith("/record") and faults.apply():
+            return jsonify({"message": "Injected failure", "status": "error"}), 503
+
+    @app.route('/record', methods=["GET", "POST"])
+    def record_service():
+        if request.method == "GET":
+            after_id = request.args.get("after_id", 0, type=int)
+            with records_lock:
+                return jsonify(records[after_id:])
+        store([parse(request.form)])
+        return jsonify({"message": "Successfully Saved Record", "status": "ok"})
+
+    @app.route('/record/bulk', methods=["POST"])
+    def record_bulk():
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, list):
+            return jsonify({"message": "Expected a JSON array of records", "status": "error"}), 400
+        try:
+            ids = store([parse(item) for item in payload])
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({"message": f"Invalid record: {str(e)}", "status": "error"}), 400
+        return jsonify({"message": f"Saved {len(ids)} records", "status": "ok", "ids": ids})
+
+    @app.route('/faults', methods=["GET", "PUT"])
+    def fault_config():
+        if request.method == "PUT":
+            try:
+                faults.update(**(request.get_json(silent=True) or {}))
+            except (TypeError, ValueError) as e:
+                return jsonify({"message": str(e), "status": "error"}), 400
+            logger.warning(f"Faults updated: {faults.snapshot()}")
+        return jsonify(faults.snapshot())
+
+    @app.route('/health')
+    def health():
+        with records_lock:
+            count = len(records)
+        return jsonify({"status": "up", "records": count, "faults": faults.snapshot()})
+
+    return app
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    create_app(FaultConfig(
+        error_rate=float(os.getenv("FAKE_DB_ERROR_RATE", "0")),
+        latency=float(os.getenv("FAKE_DB_LATENCY", "0")),
+        hang_rate=float(os.getenv("FAKE_DB_HANG_RATE", "0")),
+        hang_seconds=float(os.getenv("FAKE_DB_HANG_SECONDS", "30")),
+        seed=os.getenv("FAKE_DB_SEED")
+    )).run(host="0.0.0.0", port=int(os.getenv("PORT", "5001")), threaded=True)
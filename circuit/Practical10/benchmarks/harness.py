@@ -0,0 +1,184 @@
+"""Shared plumbing for the benchmarks: in-process servers and a load driver."""
+import os
+import sys
+import time
+import logging
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from werkzeug.serving import make_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WEB_SERVICE_DIR = os.path.join(ROOT, 'web_service')
+DB_SERVICE_DIR = os.path.join(ROOT, 'db_service')
+
+FEATURE_NAMES = ['sepal_length', 'sepal_width', 'petal_length', 'petal_width']
+
+
+def load_module(name, path, search_path=None):
+    if search_path and search_path not in sys.path:
+        sys.path.insert(0, search_path)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class ServerThread:
+    def __init__(self, app, host="127.0.0.1", port=0):
+        self.server = make_server(host, port, app, threaded=True)
+        self.url = f"http://{host}:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def start_db_service(workdir):
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'prediction.db')}"
+    module = load_module("bench_db_service", os.path.join(DB_SERVICE_DIR, 'app.py'),
+                         DB_SERVICE_DIR)
+    with module.app.app_context():
+        module.ensure_schema()
+    return module, ServerThread(module.app).start()
+
+
+def start_web_service(db_record_url, env=None):
+    os.environ["DB_SERVICE_URL"] = db_record_url
+    os.environ.setdefault("MODEL_PATH", os.path.join(WEB_SERVICE_DIR, 'model.pkl'))
+    os.environ.update(env or {})
+    module = load_module("bench_web_service", os.path.join(WEB_SERVICE_DIR, 'app.py'),
+                         WEB_SERVICE_DIR)
+    return module, ServerThread(module.app).start()
+
+
+def quiet_logging(level=logging.WARNING):
+    logging.disable(level)
+
+
+def feature_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    low = np.array([4.3, 2.0, 1.0, 0.1])
+    high = np.array([7.9, 4.4, 6.9, 2.5])
+    return np.round(rng.uniform(low, high, size=(n, 4)), 1).tolist()
+
+
+def summarize(latencies, errors, elapsed, degraded=0, fallback=0):
+    """Latency percentiles cover healthy responses only; degraded, fallback
+    and failed ones are counted but would otherwise flatter the tail."""
+    ordered = np.sort(np.asarray(latencies)) if latencies else np.zeros(1)
+    total = len(latencies) + errors + degraded + fallback
+    return {
+        "requests": total,
+        "errors": errors,
+        "degraded": degraded,
+        "fallback": fallback,
+        "unhealthy_fraction": (total - len(latencies)) / total if total else 0.0,
+        "elapsed_seconds": elapsed,
+        "requests_per_second": total / elapsed if elapsed else 0.0,
+        "ok_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": float(np.percentile(ordered, 50) * 1000),
+        "p95_ms": float(np.percentile(ordered, 95) * 1000),
+        "p99_ms": float(np.percentile(ordered, 99) * 1000),
+        "max_ms": float(ordered[-1] * 1000)
+    }
+
+
+def classify(response):
+    """Sort a web_service or db_service response into ok, degraded,
+    fallback or error.
+
+    Both services answer degraded requests with 200, so the body decides:
+    JSON replies carry a ``status`` field, /predict renders "Status: <status>"
+    and /show-result renders a "Degraded Mode:" banner when it serves the
+    local fallback buffer.
+    """
+    if response is None:
+        return "ok"
+    if response.status_code >= 400:
+        return "error"
+    if response.headers.get("Content-Type", "").startswith("application/json"):
+        body = response.json()
+        status = body.get("status") if isinstance(body, dict) else None
+        return status if status in ("degraded", "error") else "ok"
+    text = response.text
+    if "Degraded Mode:" in text:
+        return "fallback"
+    if "Status: degraded" in text:
+        return "degraded"
+    if "Status: error" in text:
+        return "error"
+    return "ok"
+
+
+def drive(request_fn, total_requests, concurrency):
+    """Call ``request_fn(session, i)`` ``total_requests`` times from
+    ``concurrency`` threads and summarize the latencies.
+
+    Each response is sorted by ``classify``; a call that raises counts as
+    an error.
+    """
+    latencies = []
+    counts = {"error": 0, "degraded": 0, "fallback": 0}
+    lock = threading.Lock()
+    counter = iter(range(total_requests))
+    local = threading.local()
+
+    def worker():
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            try:
+                outcome = classify(request_fn(session, i))
+            except (requests.RequestException, ValueError):
+                outcome = "error"
+            duration = time.perf_counter() - start
+            with lock:
+                if outcome == "ok":
+                    latencies.append(duration)
+                else:
+                    counts[outcome] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return summarize(latencies, counts["error"], time.perf_counter() - started,
+                     degraded=counts["degraded"], fallback=counts["fallback"])
+
+
+def start_fake_db_service(**fault_options):
+    module = load_module("bench_fake_db_service",
+                         os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                      'fake_db_service.py'))
+    faults = module.FaultConfig(**fault_options)
+    return faults, ServerThread(module.create_app(faults)).start()
+
+
+class VirtualClock:
+    """Wall clock that can be moved forward, so breaker reset timeouts can be
+    skipped without sleeping. Time spent inside calls is still real."""
+
+    def __init__(self):
+        self.offset = 0.0
+
+    def __call__(self):
+        return time.time() + self.offset
+
+    def advance(self, seconds):
+        self.offset += seconds
@@ -0,0 +1,137 @@
+"""Load test for the web_service and db_service.
+
+Starts the db_service (on a temporary SQLite file) and the web_service in
+this process, drives each scenario at a fixed concurrency and request count,
+and writes the results as JSON:
+
+    python benchmarks/load_test.py --concurrency 8 --requests 500
+    python benchmarks/load_test.py --compare benchmarks/results/baseline.json
+
+Web service options can be set for a run with --env, e.g.
+--env MICRO_BATCH_ENABLED=true --env READ_CACHE_ENABLED=true.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+
+from harness import (FEATURE_NAMES, drive, feature_rows, quiet_logging,
+                     start_db_service, start_web_service)
+
+BATCH_ROWS = 100
+
+
+def make_scenarios(web_url, db_url, rows):
+    def predict(session, i):
+        return session.post(f"{web_url}/predict",
+                            data=dict(zip(FEATURE_NAMES, rows[i % len(rows)])))
+
+    def show_result(session, i):
+        return session.get(f"{web_url}/show-result")
+
+    def predict_batch(session, i):
+        start = (i * BATCH_ROWS) % (len(rows) - BATCH_ROWS)
+        return session.post(f"{web_url}/predict/batch", json=rows[start:start + BATCH_ROWS])
+
+    def record_bulk(session, i):
+        start = (i * BATCH_ROWS) % (len(rows) - BATCH_ROWS)
+        records = [dict(zip(FEATURE_NAMES, row), predicted_class="Setosa")
+                   for row in rows[start:start + BATCH_ROWS]]
+        return session.post(f"{db_url}/record/bulk", json=records)
+
+    return {
+        "predict": predict,
+        "show_result": show_result,
+        "predict_batch": predict_batch,
+        "record_bulk": record_bulk
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        # Degraded and fallback answers are cheap, so raw throughput can rise
+        # while the service gets worse. Compare healthy responses per second
+        # (older baselines only have requests_per_second), and fail on any
+        # rise in the unhealthy share of more than ``tolerance``.
+        previous_ok = previous.get("ok_per_second", previous["requests_per_second"])
+        if current["ok_per_second"] < previous_ok * (1 - tolerance):
+            regressions.append(f"{name}: healthy throughput {previous_ok:.1f} -> "
+                               f"{current['ok_per_second']:.1f} req/s")
+        previous_unhealthy = previous.get("unhealthy_fraction", 0.0)
+        if current["unhealthy_fraction"] > previous_unhealthy + tolerance:
+            regressions.append(f"{name}: unhealthy responses {previous_unhealthy:.1%} -> "
+                               f"{current['unhealthy_fraction']:.1%} "
+                               f"({current['errors']} errors, {current['degraded']} degraded, "
+                               f"{current['fallback']} fallback)")
+        if current["p99_ms"] > previous["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p99 {previous['p99_ms']:.1f} -> "
+                               f"{current['p99_ms']:.1f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--scenarios', default='predict,show_result,predict_batch,record_bulk')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE')
+    parser.add_argument('--output', help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--compare', help="baseline results file to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    args = parser.parse_args()
+
+    quiet_logging()
+    env = dict(item.split('=', 1) for item in args.env)
+    workdir = tempfile.mkdtemp(prefix="iris-bench-")
+    _, db_server = start_db_service(workdir)
+    _, web_server = start_web_service(f"{db_server.url}/record", env)
+    scenarios = make_scenarios(web_server.url, db_server.url, feature_rows(2000))
+
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "env": env,
+        "scenarios": {}
+    }
+    try:
+        for name in args.scenarios.split(','):
+            # Warm up connections, caches and lazily started worker threads.
+            drive(scenarios[name], min(20, args.requests), args.concurrency)
+            results["scenarios"][name] = stats = drive(
+                scenarios[name], args.requests, args.concurrency)
+            print(f"{name:>14}: {stats['requests_per_second']:8.1f} req/s  "
+                  f"p50 {stats['p50_ms']:7.2f} ms  p95 {stats['p95_ms']:7.2f} ms  "
+                  f"p99 {stats['p99_ms']:7.2f} ms  errors {stats['errors']}  "
+                  f"degraded {stats['degraded']}  fallback {stats['fallback']}")
+    finally:
+        web_server.stop()
+        db_server.stop()
+
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'results',
+        time.strftime("%Y%m%d-%H%M%S") + '.json')
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,13 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import insert, select, func, event, delete, inspect, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import datetime, timezone
+from group_commit import GroupCommitWriter, GroupCommitTimeout
+import atexit
+import json
 import logging
+import os
 import socket
 
 logging.basicConfig(level=logging.INFO)
@@ -8,11 +15,33 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///prediction.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DATABASE_URL", 'sqlite:///prediction.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db = SQLAlchemy(app)
 
+DB_WAL_ENABLED = os.getenv("DB_WAL", "false").lower() in ("1", "true", "yes")
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "FULL")
+DB_GROUP_COMMIT_ENABLED = os.getenv(
+    "DB_GROUP_COMMIT", "false").lower() in ("1", "true", "yes")
+DB_GROUP_COMMIT_MAX_BATCH = int(os.getenv("DB_GROUP_COMMIT_MAX_BATCH", "256"))
+DB_GROUP_COMMIT_MAX_DELAY_MS = float(os.getenv("DB_GROUP_COMMIT_MAX_DELAY_MS", "5"))
+DB_GROUP_COMMIT_TIMEOUT = float(os.getenv("DB_GROUP_COMMIT_TIMEOUT", "10"))
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # FULL keeps every acknowledged commit durable across power loss, which
+    # the group-commit writer promises its callers.
+    cursor.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS}")
+    cursor.close()
+
+
+if DB_WAL_ENABLED:
+    with app.app_context():
+        event.listen(db.engine, "connect", set_sqlite_pragmas)
+
 
 class Prediction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -21,48 +50,331 @@ class Prediction(db.Model):
     petal_length = db.Column(db.Float, nullable=False)
     petal_width = db.Column(db.Float, nullable=False)
     predicted_class = db.Column(db.String(50), nullable=False)
+    created_at = db.Column(db.DateTime, index=True,
+                           default=lambda: datetime.now(timezone.utc).replace(tzinfo=None))
+
+
+class PredictionSummary(db.Model):
+    predicted_class = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False)
+    sepal_length_sum = db.Column(db.Float, nullable=False)
+    sepal_length_min = db.Column(db.Float, nullable=False)
+    sepal_length_max = db.Column(db.Float, nullable=False)
+    sepal_width_sum = db.Column(db.Float, nullable=False)
+    sepal_width_min = db.Column(db.Float, nullable=False)
+    sepal_width_max = db.Column(db.Float, nullable=False)
+    petal_length_sum = db.Column(db.Float, nullable=False)
+    petal_length_min = db.Column(db.Float, nullable=False)
+    petal_length_max = db.Column(db.Float, nullable=False)
+    petal_width_sum = db.Column(db.Float, nullable=False)
+    petal_width_min = db.Column(db.Float, nullable=False)
+    petal_width_max = db.Column(db.Float, nullable=False)
+
+
+FEATURE_NAMES = ['sepal_length', 'sepal_width', 'petal_length', 'petal_width']
+
+MAX_BULK_RECORDS = 10000
+MAX_PAGE_SIZE = 1000
+STREAM_CHUNK_SIZE = 500
+
+
+def parse_prediction(data):
+    row = {name: float(data[name]) for name in FEATURE_NAMES}
+    row["predicted_class"] = str(data["predicted_class"])
+    return row
+
+
+def summarize(rows):
+    summaries = {}
+    for row in rows:
+        summary = summaries.get(row["predicted_class"])
+        if summary is None:
+            summary = {"predicted_class": row["predicted_class"], "count": 0}
+            for name in FEATURE_NAMES:
+                summary[f"{name}_sum"] = 0.0
+                summary[f"{name}_min"] = row[name]
+                summary[f"{name}_max"] = row[name]
+            summaries[row["predicted_class"]] = summary
+        summary["count"] += 1
+        for name in FEATURE_NAMES:
+            summary[f"{name}_sum"] += row[name]
+            summary[f"{name}_min"] = min(summary[f"{name}_min"], row[name])
+            summary[f"{name}_max"] = max(summary[f"{name}_max"], row[name])
+    return list(summaries.values())
+
+
+def update_summary(rows):
+    table = PredictionSummary.__table__
+    for summary in summarize(rows):
+        stmt = sqlite_insert(table).values(summary)
+        updates = {"count": table.c.count + stmt.excluded.count}
+        for name in FEATURE_NAMES:
+            updates[f"{name}_sum"] = table.c[f"{name}_sum"] + stmt.excluded[f"{name}_sum"]
+            updates[f"{name}_min"] = func.min(table.c[f"{name}_min"], stmt.excluded[f"{name}_min"])
+            updates[f"{name}_max"] = func.max(table.c[f"{name}_max"], stmt.excluded[f"{name}_max"])
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.predicted_class], set_=updates))
+
+
+def insert_predictions(rows):
+    # sort_by_parameter_order guarantees ids[i] belongs to rows[i]. SQLite has
+    # no insert sentinel, so SQLAlchemy runs one INSERT per row for this, but
+    # all inside the same transaction it costs about as much as one
+    # multi-row VALUES statement.
+    ids = db.session.scalars(
+        insert(Prediction).returning(Prediction.id, sort_by_parameter_order=True),
+        rows).all()
+    # The summary rows are updated in the same transaction, so they can
+    # never disagree with the prediction table.
+    update_summary(rows)
+    db.session.commit()
+    return ids
+
+
+def rebuild_summary():
+    columns = [Prediction.predicted_class, func.count(Prediction.id)]
+    for name in FEATURE_NAMES:
+        column = getattr(Prediction, name)
+        columns += [func.sum(column), func.min(column), func.max(column)]
+    db.session.execute(delete(PredictionSummary))
+    db.session.execute(insert(PredictionSummary).from_select(
+        [c.name for c in PredictionSummary.__table__.columns],
+        select(*columns).group_by(Prediction.predicted_class)))
+    db.session.commit()
+
+
+def ensure_schema():
+    db.create_all()
+    columns = {c["name"] for c in inspect(db.engine).get_columns("prediction")}
+    if "created_at" not in columns:
+        db.session.execute(text("ALTER TABLE prediction ADD COLUMN created_at DATETIME"))
+        db.session.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_prediction_created_at ON prediction (created_at)"))
+        db.session.commit()
+
+    summarized = db.session.scalar(select(func.coalesce(func.sum(PredictionSummary.count), 0)))
+    if summarized != db.session.scalar(select(func.count(Prediction.id))):
+        logger.info("Rebuilding prediction summary table")
+        rebuild_summary()
+
+
+# Runs on import, so gunicorn/flask run get the same schema migration and
+# summary check as `python app.py`.
+with app.app_context():
+    ensure_schema()
+
+
+def commit_group(rows):
+    with app.app_context():
+        return insert_predictions(rows)
+
+
+group_writer = GroupCommitWriter(
+    commit_group,
+    max_batch=DB_GROUP_COMMIT_MAX_BATCH,
+    max_delay=DB_GROUP_COMMIT_MAX_DELAY_MS / 1000,
+    submit_timeout=DB_GROUP_COMMIT_TIMEOUT) if DB_GROUP_COMMIT_ENABLED else None
+
+if group_writer is not None:
+    atexit.register(group_writer.close)
+
+
+@app.errorhandler(GroupCommitTimeout)
+def group_commit_timeout(e):
+    logger.error(str(e))
+    return jsonify({"message": str(e), "status": "error"}), 503
+
+
+def save_predictions(rows):
+    if group_writer is not None:
+        return group_writer.submit(rows)
+    return insert_predictions(rows)
+
+
+def record_query(after_id=0, limit=None):
+    query = select(Prediction.id, Prediction.sepal_length, Prediction.sepal_width,
+                   Prediction.petal_length, Prediction.petal_width,
+                   Prediction.predicted_class).order_by(Prediction.id)
+    if after_id:
+        query = query.where(Prediction.id > after_id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def table_etag():
+    # Predictions are insert-only, so the highest id changes whenever the
+    # table does. max() on the integer primary key is a single b-tree seek,
+    # where count() would scan the whole table on every GET.
+    max_id = db.session.scalar(select(func.max(Prediction.id)))
+    return str(max_id or 0)
+
+
+def wants_ndjson():
+    if request.args.get("format") == "ndjson":
+        return True
+    return request.accept_mimetypes.best == "application/x-ndjson"
+
+
+def stream_records(after_id):
+    query = record_query(after_id).execution_options(yield_per=STREAM_CHUNK_SIZE)
+    count = 0
+    for row in db.session.execute(query).mappings():
+        count += 1
+        yield json.dumps(dict(row)) + "\n"
+    logger.info(
+        f"Streamed {count} records from {socket.gethostname()}")
+
+
+def int_arg(name, minimum, default=None):
+    # request.args.get(type=int) turns a bad value into the default, which
+    # for limit would silently mean "the whole table".
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer") from None
+    if number < minimum:
+        raise ValueError(f"{name} must be at least {minimum}")
+    return number
 
 
 @app.route('/record', methods=["GET", "POST"])
 def record_service():
     if request.method == "GET":
-        records = Prediction.query.all()
-        records = [{"id": rec.id, "sepal_length": rec.sepal_length, "sepal_width": rec.sepal_width,
-                    "petal_length": rec.petal_length, "petal_width": rec.petal_width,
-                    "predicted_class": rec.predicted_class} for rec in records]
+        try:
+            after_id = int_arg("after_id", minimum=0, default=0)
+            limit = int_arg("limit", minimum=1)
+        except ValueError as e:
+            return jsonify({"message": str(e), "status": "error"}), 400
+
+        if wants_ndjson():
+            return Response(stream_with_context(stream_records(after_id)),
+                            mimetype="application/x-ndjson")
+
+        etag = table_etag()
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+
+        if limit is not None:
+            limit = min(limit, MAX_PAGE_SIZE)
+        records = [dict(row) for row in
+                   db.session.execute(record_query(after_id, limit)).mappings()]
         logger.info(
             f"Retrieved {len(records)} records from {socket.gethostname()}")
-        return jsonify(records)
-    else:
-        sepal_length = float(request.form['sepal_length'])
-        sepal_width = float(request.form['sepal_width'])
-        petal_length = float(request.form['petal_length'])
-        petal_width = float(request.form['petal_width'])
-        predicted_class = request.form["predicted_class"]
-
-        pred = Prediction(sepal_length=sepal_length, sepal_width=sepal_width,
-                          petal_length=petal_length, petal_width=petal_width,
-                          predicted_class=predicted_class)
 
-        db.session.add(pred)
-        db.session.commit()
+        response = jsonify(records)
+        response.set_etag(etag, weak=True)
+        if limit is not None and len(records) == limit:
+            response.headers["X-Next-After-Id"] = str(records[-1]["id"])
+        return response
+    else:
+        row = parse_prediction(request.form)
+        save_predictions([row])
         logger.info(
-            f"Saved prediction: {predicted_class} on {socket.gethostname()}")
+            f"Saved prediction: {row['predicted_class']} on {socket.gethostname()}")
 
         return jsonify({"message": "Successfully Saved Record", "status": "ok"})
 
 
+@app.route('/record/bulk', methods=["POST"])
+def record_bulk():
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, list):
+        return jsonify({"message": "Expected a JSON array of records", "status": "error"}), 400
+    if len(payload) > MAX_BULK_RECORDS:
+        return jsonify({"message": f"Bulk insert is limited to {MAX_BULK_RECORDS} records",
+                        "status": "error"}), 400
+
+    try:
+        rows = [parse_prediction(item) for item in payload]
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"message": f"Invalid record: {str(e)}", "status": "error"}), 400
+
+    ids = save_predictions(rows) if rows else []
+    logger.info(
+        f"Saved {len(ids)} predictions in bulk on {socket.gethostname()}")
+
+    return jsonify({"message": "Successfully Saved Records", "status": "ok",
+                    "count": len(ids), "ids": ids})
+
+
+def parse_timestamp(value):
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def stats_from_summary():
+    classes = {}
+    for summary in db.session.scalars(select(PredictionSummary)):
+        stats = {"count": summary.count}
+        for name in FEATURE_NAMES:
+            stats[name] = {
+                "min": getattr(summary, f"{name}_min"),
+                "max": getattr(summary, f"{name}_max"),
+                "mean": getattr(summary, f"{name}_sum") / summary.count
+            }
+        classes[summary.predicted_class] = stats
+    return classes
+
+
+def stats_from_query(filters):
+    columns = [Prediction.predicted_class, func.count(Prediction.id)]
+    for name in FEATURE_NAMES:
+        column = getattr(Prediction, name)
+        columns += [func.min(column), func.max(column), func.avg(column)]
+
+    classes = {}
+    query = select(*columns).where(*filters).group_by(Prediction.predicted_class)
+    for row in db.session.execute(query):
+        stats = {"count": row[1]}
+        for i, name in enumerate(FEATURE_NAMES):
+            low, high, mean = row[2 + 3 * i:5 + 3 * i]
+            stats[name] = {"min": low, "max": high, "mean": mean}
+        classes[row[0]] = stats
+    return classes
+
+
+@app.route('/record/stats')
+def record_stats():
+    try:
+        filters = []
+        if "after_id" in request.args:
+            filters.append(Prediction.id > int(request.args["after_id"]))
+        if "before_id" in request.args:
+            filters.append(Prediction.id < int(request.args["before_id"]))
+        if "since" in request.args:
+            filters.append(Prediction.created_at >= parse_timestamp(request.args["since"]))
+        if "until" in request.args:
+            filters.append(Prediction.created_at < parse_timestamp(request.args["until"]))
+    except ValueError as e:
+        return jsonify({"message": f"Invalid filter: {str(e)}", "status": "error"}), 400
+
+    classes = stats_from_query(filters) if filters else stats_from_summary()
+    return jsonify({
+        "status": "ok",
+        "source": "query" if filters else "summary",
+        "total": sum(stats["count"] for stats in classes.values()),
+        "classes": classes
+    })
+
+
 @app.route('/health')
 def health():
     return jsonify({
         "status": "up",
         "service": "db_service",
-        "hostname": socket.gethostname()
+        "hostname": socket.gethostname(),
+        "group_commit": group_writer.stats() if group_writer else {"enabled": False}
     })
 
 
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
     logger.info(f"Starting DB service on {socket.gethostname()}")
     app.run(host="0.0.0.0", port=5001, debug=False)
@@ -0,0 +1,148 @@
+import os
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class GroupCommitTimeout(TimeoutError):
+    pass
+
+
+class GroupCommitWriter:
+    """Funnels inserts from many request threads through one writer thread.
+
+    The writer takes the first waiting request, keeps collecting for up to
+    ``max_delay`` seconds or until ``max_batch`` rows are pending, and hands
+    the whole group to ``commit_fn`` as one transaction. ``submit`` returns
+    only after that commit, so a request is never acknowledged before its
+    rows are durable.
+
+    ``submit`` waits at most ``submit_timeout`` seconds. Rows still queued
+    at that point are withdrawn; rows whose commit is already running may
+    still land, so the caller should treat a GroupCommitTimeout like any
+    other ambiguous write failure.
+    """
+
+    def __init__(self, commit_fn, max_batch=256, max_delay=0.005, submit_timeout=10.0):
+        self.commit_fn = commit_fn
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.submit_timeout = submit_timeout
+        self.groups = 0
+        self.rows = 0
+        self.timeouts = 0
+        self.writer_errors = 0
+        self._queue = queue.Queue()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._closed = False
+
+    def submit(self, rows, timeout=None):
+        if self._closed:
+            raise RuntimeError("GroupCommitWriter is closed")
+        self._ensure_started()
+        future = Future()
+        self._queue.put((rows, future))
+        timeout = self.submit_timeout if timeout is None else timeout
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            if not future.done():
+                self.timeouts += 1
+                withdrawn = future.cancel()
+                raise GroupCommitTimeout(
+                    f"Group commit of {len(rows)} rows did not finish in {timeout}s"
+                    + ("" if withdrawn else "; the commit is still running")) from None
+            raise
+
+    def close(self, timeout=5.0):
+        """Commit whatever is already queued, then stop the writer thread."""
+        self._closed = True
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "groups": self.groups,
+            "rows": self.rows,
+            "average_group_rows": self.rows / self.groups if self.groups else 0.0,
+            "pending": self._queue.qsize(),
+            "timeouts": self.timeouts,
+            "writer_errors": self.writer_errors,
+            "writer_alive": self._thread is not None and self._thread.is_alive()
+        }
+
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="group-commit", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        """Return the next group and whether close() was requested."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        group = [first]
+        pending_rows = len(first[0])
+        deadline = time.monotonic() + self.max_delay
+        while pending_rows < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return group, True
+            group.append(item)
+            pending_rows += len(item[0])
+        return group, False
+
+    def _run(self):
+        while True:
+            group, stopping = self._collect()
+            # Submitters that already timed out cancelled their future, and
+            # their rows are dropped here instead of committed behind their back.
+            group = [(rows, future) for rows, future in group
+                     if future.set_running_or_notify_cancel()]
+            if group:
+                self._commit(group)
+            if stopping:
+                return
+
+    def _commit(self, group):
+        try:
+            rows = [row for item_rows, _ in group for row in item_rows]
+            ids = self.commit_fn(rows)
+            if len(ids) != len(rows):
+                raise RuntimeError(f"commit_fn returned {len(ids)} ids for {len(rows)} rows")
+        except Exception as e:
+            self.writer_errors += 1
+            logger.error(f"Group commit of {len(group)} requests failed: {str(e)}")
+            for _, future in group:
+                future.set_exception(e)
+            return
+
+        self.groups += 1
+        self.rows += len(rows)
+        offset = 0
+        for item_rows, future in group:
+            future.set_result(ids[offset:offset + len(item_rows)])
+            offset += len(item_rows)
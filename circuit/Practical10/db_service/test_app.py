@@ -0,0 +1,157 @@
+import os
+import json
+import tempfile
+import pytest
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(
+    tempfile.mkdtemp(prefix="db-service-test-"), "prediction.db")
+
+import app as app_module  # noqa: E402
+from app import app, db, Prediction  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.drop_all()
+        app_module.ensure_schema()
+    with app.test_client() as client:
+        yield client
+
+
+def record(i, predicted_class="Setosa"):
+    return {"sepal_length": 5.0 + i / 10, "sepal_width": 3.0 + i / 100,
+            "petal_length": 1.0 + i / 1000, "petal_width": 0.2,
+            "predicted_class": predicted_class}
+
+
+def test_bulk_ids_match_their_payloads(client):
+    payload = [record(i, ["Setosa", "Versicolor", "Virginica"][i % 3]) for i in range(50)]
+    response = client.post('/record/bulk', json=payload)
+    assert response.status_code == 200
+    ids = response.get_json()["ids"]
+    assert len(ids) == len(payload)
+
+    with app.app_context():
+        for record_id, sent in zip(ids, payload):
+            row = db.session.get(Prediction, record_id)
+            assert row.sepal_length == sent["sepal_length"]
+            assert row.sepal_width == sent["sepal_width"]
+            assert row.predicted_class == sent["predicted_class"]
+
+
+def test_record_etag_changes_only_on_insert(client):
+    client.post('/record/bulk', json=[record(0)])
+    first = client.get('/record')
+    etag = first.headers["ETag"]
+
+    cached = client.get('/record', headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+    client.post('/record/bulk', json=[record(1)])
+    changed = client.get('/record', headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert len(changed.get_json()) == 2
+
+
+def summary_matches_group_by():
+    with app.app_context():
+        from_summary = app_module.stats_from_summary()
+        from_query = app_module.stats_from_query([])
+    assert set(from_summary) == set(from_query)
+    for predicted_class, stats in from_query.items():
+        summary = from_summary[predicted_class]
+        assert summary["count"] == stats["count"]
+        for name in app_module.FEATURE_NAMES:
+            assert summary[name]["min"] == stats[name]["min"]
+            assert summary[name]["max"] == stats[name]["max"]
+            assert summary[name]["mean"] == pytest.approx(stats[name]["mean"])
+    return from_summary
+
+
+def test_summary_matches_group_by_after_inserts(client):
+    client.post('/record/bulk', json=[record(i, "Setosa") for i in range(5)])
+    client.post('/record/bulk', json=[record(i, "Virginica") for i in range(5, 8)])
+    client.post('/record', data=record(9, "Setosa"))
+
+    summary = summary_matches_group_by()
+    assert summary["Setosa"]["count"] == 6
+    assert summary["Virginica"]["count"] == 3
+
+
+def test_ensure_schema_rebuilds_a_stale_summary(client):
+    client.post('/record/bulk', json=[record(i, ["Setosa", "Versicolor"][i % 2])
+                                      for i in range(10)])
+    with app.app_context():
+        db.session.execute(app_module.delete(app_module.PredictionSummary))
+        db.session.commit()
+        assert app_module.stats_from_summary() == {}
+        app_module.ensure_schema()
+
+    summary = summary_matches_group_by()
+    assert summary["Setosa"]["count"] == summary["Versicolor"]["count"] == 5
+
+
+def test_record_pages_follow_the_next_after_id_header(client):
+    ids = client.post('/record/bulk', json=[record(i) for i in range(7)]).get_json()["ids"]
+
+    pages, after_id = [], 0
+    while True:
+        response = client.get(f'/record?limit=3&after_id={after_id}')
+        assert response.status_code == 200
+        pages.append([row["id"] for row in response.get_json()])
+        if "X-Next-After-Id" not in response.headers:
+            break
+        after_id = int(response.headers["X-Next-After-Id"])
+        assert after_id == pages[-1][-1]
+
+    assert pages == [ids[0:3], ids[3:6], ids[6:7]]
+
+
+def test_record_last_full_page_is_followed_by_an_empty_one(client):
+    ids = client.post('/record/bulk', json=[record(i) for i in range(4)]).get_json()["ids"]
+
+    response = client.get(f'/record?limit=2&after_id={ids[1]}')
+    assert [row["id"] for row in response.get_json()] == ids[2:4]
+    assert response.headers["X-Next-After-Id"] == str(ids[3])
+
+    last = client.get(f'/record?limit=2&after_id={ids[3]}')
+    assert last.get_json() == []
+    assert "X-Next-After-Id" not in last.headers
+
+
+def test_record_without_limit_has_no_next_header(client):
+    client.post('/record/bulk', json=[record(i) for i in range(3)])
+    response = client.get('/record')
+    assert len(response.get_json()) == 3
+    assert "X-Next-After-Id" not in response.headers
+
+
+def test_record_ndjson_stream(client):
+    ids = client.post('/record/bulk', json=[record(i) for i in range(5)]).get_json()["ids"]
+
+    # Each streamed body is read before the next request is made.
+    for kwargs in ({"query_string": {"format": "ndjson"}},
+                   {"headers": {"Accept": "application/x-ndjson"}}):
+        response = client.get('/record', **kwargs)
+        assert response.mimetype == "application/x-ndjson"
+        lines = response.get_data(as_text=True).splitlines()
+        assert [json.loads(line)["id"] for line in lines] == ids
+
+    after = client.get(f'/record?format=ndjson&after_id={ids[1]}')
+    assert len(after.get_data(as_text=True).splitlines()) == 3
+
+
+@pytest.mark.parametrize("query", [
+    "limit=abc", "limit=0", "limit=-1", "limit=1.5",
+    "after_id=abc", "after_id=-1", "format=ndjson&after_id=x"])
+def test_record_rejects_bad_paging_parameters(client, query):
+    response = client.get(f'/record?{query}')
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,127 @@
+import time
+import threading
+import pytest
+from group_commit import GroupCommitWriter, GroupCommitTimeout
+
+
+class BlockingCommit:
+    """commit_fn that records each group and can hold the writer thread."""
+
+    def __init__(self):
+        self.groups = []
+        self.release = threading.Event()
+        self.release.set()
+        self.entered = threading.Event()
+        self.next_id = 1
+
+    def __call__(self, rows):
+        self.entered.set()
+        self.release.wait(5)
+        self.groups.append(list(rows))
+        ids = list(range(self.next_id, self.next_id + len(rows)))
+        self.next_id += len(rows)
+        return ids
+
+
+def submit_in_thread(writer, rows, results, **kwargs):
+    def run():
+        try:
+            results[rows[0]] = writer.submit(rows, **kwargs)
+        except Exception as e:
+            results[rows[0]] = e
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_waiting_requests_are_committed_as_one_group():
+    commit = BlockingCommit()
+    writer = GroupCommitWriter(commit, max_batch=100, max_delay=0.05)
+    commit.release.clear()
+    results = {}
+    first = submit_in_thread(writer, ["a"], results)
+    assert commit.entered.wait(1)
+
+    threads = [submit_in_thread(writer, [name, name], results) for name in "bcde"]
+    commit.release.set()
+    for thread in [first] + threads:
+        thread.join(5)
+
+    assert commit.groups[0] == ["a"]
+    assert sorted(commit.groups[1]) == sorted("bbccddee")
+    assert results["a"] == [1]
+    # Each caller gets the ids of its own rows, in submission order.
+    for name in "bcde":
+        start = commit.groups[1].index(name) + 2
+        assert results[name] == [start, start + 1]
+    writer.close()
+
+
+def test_commit_error_reaches_every_caller_and_writer_keeps_running():
+    calls = []
+
+    def commit(rows):
+        calls.append(rows)
+        if len(calls) == 1:
+            raise RuntimeError("disk I/O error")
+        return list(range(len(rows)))
+
+    writer = GroupCommitWriter(commit, max_delay=0)
+    with pytest.raises(RuntimeError, match="disk I/O error"):
+        writer.submit(["a"])
+    assert writer.submit(["b", "c"]) == [0, 1]
+    assert writer.stats()["writer_errors"] == 1
+    writer.close()
+
+
+def test_wrong_id_count_fails_the_group():
+    writer = GroupCommitWriter(lambda rows: [1], max_delay=0)
+    with pytest.raises(RuntimeError, match="1 ids for 2 rows"):
+        writer.submit(["a", "b"])
+    writer.close()
+
+
+def test_submit_times_out_and_queued_rows_are_withdrawn():
+    commit = BlockingCommit()
+    writer = GroupCommitWriter(commit, max_batch=1, max_delay=0)
+    commit.release.clear()
+    results = {}
+    running = submit_in_thread(writer, ["a"], results)
+    assert commit.entered.wait(1)
+
+    with pytest.raises(GroupCommitTimeout):
+        writer.submit(["b"], timeout=0.05)
+    commit.release.set()
+    running.join(5)
+    writer.close()
+
+    assert results["a"] == [1]
+    assert commit.groups == [["a"]]
+    assert writer.stats()["timeouts"] == 1
+
+
+def test_close_commits_queued_rows_then_stops():
+    commit = BlockingCommit()
+    writer = GroupCommitWriter(commit, max_batch=1, max_delay=0)
+    commit.release.clear()
+    results = {}
+    threads = [submit_in_thread(writer, ["a"], results)]
+    assert commit.entered.wait(1)
+    threads += [submit_in_thread(writer, [name], results) for name in "bc"]
+    deadline = time.monotonic() + 1
+    while writer.stats()["pending"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+    commit.release.set()
+    writer.close()
+    for thread in threads:
+        thread.join(5)
+
+    assert sorted(results.values()) == [[1], [2], [3]]
+    assert not writer.stats()["writer_alive"]
+    with pytest.raises(RuntimeError, match="closed"):
+        writer.submit(["d"])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,22 +1,97 @@
-from flask import Flask, render_template, request, redirect, jsonify
-import requests
+from flask import Flask, render_template, request, redirect, jsonify, g, Response
 import pickle
 import numpy as np
 import os
 from circuit_breaker import handle_db_failure, db_circuit_breaker
-from tenacity import retry, stop_after_attempt, wait_exponential
+from bulkhead import Bulkhead, BulkheadFullError, BulkheadMetric
+from micro_batcher import MicroBatcher
+from lru_cache import LRUCache
+from write_behind import WriteBehindQueue
+from ring_buffer import PredictionRingBuffer, BufferReplayer
+from http_client import PooledHTTPClient
+from worker_stats import WorkerStats
+from compiled_model import CompiledModel
+from read_cache import StaleWhileRevalidateCache, NOT_MODIFIED
+from metrics import (MetricsRegistry, HistogramFamily, CounterFamily, Gauge,
+                     latency_buckets_from_env, PROMETHEUS_CONTENT_TYPE)
+from retry_policy import (Deadline, RetryBudget, LatencyTracker, hedged_call,
+                          stop_before_deadline, stop_when_budget_exhausted)
+from tenacity import (Retrying, stop_after_attempt, wait_exponential,
+                      retry_if_not_exception_type)
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from collections import namedtuple
+import multiprocessing
+import threading
+import ctypes
 import logging
 import socket
+import csv
+import io
+import atexit
+import time
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
-model_path = os.path.join('model.pkl')
-with open(model_path, 'rb') as f:
-    model = pickle.load(f)
+model_path = os.getenv("MODEL_PATH", os.path.join('model.pkl'))
+
+
+def load_model(path):
+    if path.endswith('.npz'):
+        return CompiledModel.load(path)
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+_model_load_started = time.perf_counter()
+_initial_model = load_model(model_path)
+MODEL_LOAD_SECONDS = time.perf_counter() - _model_load_started
+
+# Bumped by POST /model/reload. Allocated before gunicorn forks, so every
+# worker sees it and reloads its own copy on its next request.
+model_generation = multiprocessing.RawValue(ctypes.c_ulonglong, 0)
+model_generation_lock = multiprocessing.Lock()
+_model_swap_lock = threading.Lock()
+
+worker_stats = WorkerStats(max_workers=int(os.getenv("MAX_WORKERS", "32")))
 
 DB_SERVICE_URL = os.getenv("DB_SERVICE_URL", "http://dbapp:5001/record")
+DB_SERVICE_BULK_URL = os.getenv("DB_SERVICE_BULK_URL", f"{DB_SERVICE_URL}/bulk")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_CONNECT_TIMEOUT = float(os.getenv("DB_CONNECT_TIMEOUT", "1.0"))
+DB_READ_TIMEOUT = float(os.getenv("DB_READ_TIMEOUT", "5.0"))
+
+DB_READ_DEADLINE = float(os.getenv("DB_READ_DEADLINE", "8.0"))
+DB_RETRY_BUDGET_RATIO = float(os.getenv("DB_RETRY_BUDGET_RATIO", "0.1"))
+DB_HEDGE_ENABLED = os.getenv(
+    "DB_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+DB_HEDGE_PERCENTILE = float(os.getenv("DB_HEDGE_PERCENTILE", "0.95"))
+
+READ_CACHE_ENABLED = os.getenv(
+    "READ_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+READ_CACHE_MAX_AGE = float(os.getenv("READ_CACHE_MAX_AGE", "5.0"))
+
+# Limits on request threads waiting on the db_service, per direction, so a
+# slow database cannot take every thread away from pure-CPU predictions.
+# Off by default: the limits are below the thread count, so a busy but
+# healthy database also gets calls rejected once they are enabled.
+DB_BULKHEAD_ENABLED = os.getenv(
+    "DB_BULKHEAD_ENABLED", "false").lower() in ("1", "true", "yes")
+DB_BULKHEAD_DEFAULT = max(1, int(os.getenv("GUNICORN_THREADS", "4")) // 2)
+DB_WRITE_MAX_CONCURRENT = int(os.getenv("DB_WRITE_MAX_CONCURRENT", str(DB_BULKHEAD_DEFAULT)))
+DB_READ_MAX_CONCURRENT = int(os.getenv("DB_READ_MAX_CONCURRENT", str(DB_BULKHEAD_DEFAULT)))
+DB_BULKHEAD_MAX_WAIT = float(os.getenv("DB_BULKHEAD_MAX_WAIT", "0.05"))
+
+db_write_bulkhead = Bulkhead(
+    "db_write", DB_WRITE_MAX_CONCURRENT, DB_BULKHEAD_MAX_WAIT) if DB_BULKHEAD_ENABLED else None
+db_read_bulkhead = Bulkhead(
+    "db_read", DB_READ_MAX_CONCURRENT, DB_BULKHEAD_MAX_WAIT) if DB_BULKHEAD_ENABLED else None
+
+db_client = PooledHTTPClient(pool_size=DB_POOL_SIZE,
+                             connect_timeout=DB_CONNECT_TIMEOUT,
+                             read_timeout=DB_READ_TIMEOUT)
 
 iris_classes = {
     0: 'Setosa',
@@ -24,23 +99,283 @@ iris_classes = {
     2: 'Virginica'
 }
 
-prediction_cache = []
+FEATURE_NAMES = ['sepal_length', 'sepal_width', 'petal_length', 'petal_width']
+
+# The model and its label lookup are swapped together in one assignment, so
+# a request reads both from the same LoadedModel.
+LoadedModel = namedtuple("LoadedModel", ["model", "class_labels", "generation"])
+
+
+def make_loaded_model(model, generation):
+    return LoadedModel(model, np.array([iris_classes[c] for c in model.classes_]), generation)
+
+
+loaded_model = make_loaded_model(_initial_model, 0)
+
+MAX_BATCH_ROWS = int(os.getenv("MAX_BATCH_ROWS", "10000"))
+
+MICRO_BATCH_ENABLED = os.getenv(
+    "MICRO_BATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+MICRO_BATCH_WINDOW_MS = float(os.getenv("MICRO_BATCH_WINDOW_MS", "5"))
+MICRO_BATCH_MAX_SIZE = int(os.getenv("MICRO_BATCH_MAX_SIZE", "32"))
+
+MEMO_CACHE_SIZE = int(os.getenv("MEMO_CACHE_SIZE", "4096"))
+MEMO_CACHE_TTL = float(os.getenv("MEMO_CACHE_TTL", "0")) or None
+MEMO_CACHE_DECIMALS = int(os.getenv("MEMO_CACHE_DECIMALS", "6"))
+
+WRITE_BEHIND_ENABLED = os.getenv(
+    "WRITE_BEHIND_ENABLED", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND_MAX_QUEUE = int(os.getenv("WRITE_BEHIND_MAX_QUEUE", "10000"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "50"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(
+    os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "1.0"))
+
+FALLBACK_BUFFER_CAPACITY = int(os.getenv("FALLBACK_BUFFER_CAPACITY", "10000"))
+FALLBACK_BUFFER_OVERFLOW = os.getenv("FALLBACK_BUFFER_OVERFLOW", "drop_oldest")
+REPLAY_BATCH_SIZE = int(os.getenv("REPLAY_BATCH_SIZE", "100"))
+
+prediction_cache = PredictionRingBuffer(FALLBACK_BUFFER_CAPACITY,
+                                        FEATURE_NAMES,
+                                        iris_classes.values(),
+                                        overflow=FALLBACK_BUFFER_OVERFLOW)
+memo_cache = LRUCache(maxsize=MEMO_CACHE_SIZE,
+                      ttl=MEMO_CACHE_TTL) if MEMO_CACHE_SIZE > 0 else None
+
 
+def run_model(features):
+    return loaded_model.model.predict(features)
 
-@handle_db_failure
+
+micro_batcher = MicroBatcher(run_model,
+                             max_batch_size=MICRO_BATCH_MAX_SIZE,
+                             max_wait=MICRO_BATCH_WINDOW_MS / 1000) if MICRO_BATCH_ENABLED else None
+
+
+def swap_model(generation, new_model=None):
+    global loaded_model
+    with _model_swap_lock:
+        if loaded_model.generation >= generation:
+            return
+        if new_model is None:
+            new_model = load_model(model_path)
+        loaded_model = make_loaded_model(new_model, generation)
+    if memo_cache is not None:
+        memo_cache.clear()
+    logger.info(f"Loaded model generation {generation} from {model_path} in pid {os.getpid()}")
+
+
+def reload_model():
+    """Reload the model here and tell the other workers to do the same."""
+    # Load before publishing the new generation, so a bad file fails the
+    # request instead of every worker.
+    new_model = load_model(model_path)
+    with model_generation_lock:
+        model_generation.value += 1
+        generation = model_generation.value
+    swap_model(generation, new_model)
+    return generation
+
+
+def sync_model():
+    generation = model_generation.value
+    if loaded_model.generation < generation:
+        swap_model(generation)
+
+
+def memo_key(features):
+    # Keyed by model generation so a prediction from the previous model
+    # that lands after a reload is never served.
+    return (loaded_model.generation,) + tuple(
+        round(float(value), MEMO_CACHE_DECIMALS) for value in features)
+
+
+def predict_one(features):
+    if memo_cache is not None:
+        key = memo_key(features)
+        pred = memo_cache.get(key)
+        if pred is not None:
+            return pred
+
+    if micro_batcher is not None:
+        pred = micro_batcher.predict(features)
+    else:
+        pred = run_model(features.reshape(1, -1))[0]
+
+    if memo_cache is not None:
+        memo_cache.put(key, pred)
+    return pred
+
+
+@handle_db_failure(bulkhead=db_write_bulkhead)
 def save_to_database(data):
-    response = requests.post(DB_SERVICE_URL, data=data, timeout=5)
+    response = db_client.post(DB_SERVICE_URL, data=data)
     response.raise_for_status()
+    invalidate_records_cache()
     return response.json()
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
-def get_from_database():
-    response = requests.get(DB_SERVICE_URL, timeout=5)
+def post_records(records):
+    response = db_client.post(DB_SERVICE_BULK_URL, json=records)
     response.raise_for_status()
+    invalidate_records_cache()
     return response.json()
 
 
+buffer_replayer = BufferReplayer(prediction_cache, post_records,
+                                 db_circuit_breaker,
+                                 batch_size=REPLAY_BATCH_SIZE)
+db_circuit_breaker.add_listener(buffer_replayer)
+
+write_behind = WriteBehindQueue(post_records,
+                                max_queue=WRITE_BEHIND_MAX_QUEUE,
+                                batch_size=WRITE_BEHIND_BATCH_SIZE,
+                                flush_interval=WRITE_BEHIND_FLUSH_INTERVAL,
+                                breaker=db_circuit_breaker) if WRITE_BEHIND_ENABLED else None
+
+if write_behind is not None:
+    atexit.register(write_behind.close)
+
+
+def persist_prediction(prediction_data):
+    if write_behind is None:
+        return save_to_database(prediction_data)
+    if write_behind.submit(prediction_data):
+        return {"status": "queued"}
+    return {
+        "status": "degraded",
+        "message": "Write-behind queue is full",
+        "cached": True
+    }
+
+
+read_retry_budget = RetryBudget(ratio=DB_RETRY_BUDGET_RATIO)
+read_latency = LatencyTracker()
+hedge_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE,
+                                    thread_name_prefix="db-hedge") if DB_HEDGE_ENABLED else None
+
+
+def fetch_records(deadline, etag=None):
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise TimeoutError("Deadline exceeded before request to db_service")
+    start = time.perf_counter()
+    response = db_client.get(DB_SERVICE_URL,
+                             headers={"If-None-Match": etag} if etag else None,
+                             timeout=(min(DB_CONNECT_TIMEOUT, remaining),
+                                      min(DB_READ_TIMEOUT, remaining)))
+    read_latency.observe(time.perf_counter() - start)
+    if response.status_code == 304:
+        return NOT_MODIFIED, etag
+    response.raise_for_status()
+    return response.json(), response.headers.get("ETag")
+
+
+def get_from_database(deadline=None, etag=None):
+    deadline = deadline or Deadline(DB_READ_DEADLINE)
+    read_retry_budget.record_request()
+    retrying = Retrying(stop=(stop_after_attempt(3)
+                              | stop_before_deadline(deadline)
+                              | stop_when_budget_exhausted(read_retry_budget)),
+                        wait=wait_exponential(multiplier=1, min=2, max=10),
+                        # A full bulkhead means the database is already busy;
+                        # fall back now rather than queue up for another try.
+                        retry=retry_if_not_exception_type(BulkheadFullError),
+                        reraise=True)
+    for attempt in retrying:
+        # The slot is held per attempt, not across the backoff sleeps.
+        with attempt, db_read_bulkhead or nullcontext():
+            if hedge_executor is None:
+                return fetch_records(deadline, etag)
+            return hedged_call(lambda: fetch_records(deadline, etag), hedge_executor,
+                               read_latency.percentile(DB_HEDGE_PERCENTILE),
+                               read_retry_budget, deadline)
+
+
+records_cache = StaleWhileRevalidateCache(
+    lambda etag: get_from_database(etag=etag),
+    max_age=READ_CACHE_MAX_AGE) if READ_CACHE_ENABLED else None
+
+
+def invalidate_records_cache():
+    if records_cache is not None:
+        records_cache.invalidate()
+
+
+def read_records():
+    if records_cache is not None:
+        return records_cache.get()
+    return get_from_database()[0]
+
+
+LATENCY_BUCKETS = latency_buckets_from_env()
+
+# Each gunicorn worker keeps its own metrics, and a scrape reaches one of
+# them. The worker label keeps their series apart, so sum by everything but
+# worker in queries (e.g. sum without (worker) (rate(web_requests_total[5m]))).
+metrics_registry = MetricsRegistry(const_labels=lambda: {"worker": str(os.getpid())})
+request_counter = metrics_registry.register(CounterFamily(
+    "web_requests_total", ["route", "method", "status"],
+    "HTTP requests by route, method and status code"))
+request_latency = metrics_registry.register(HistogramFamily(
+    "web_request_duration_seconds", LATENCY_BUCKETS, ["route"],
+    "End-to-end request latency by route"))
+stage_latency = metrics_registry.register(HistogramFamily(
+    "web_stage_duration_seconds", LATENCY_BUCKETS, ["route", "stage"],
+    "Time spent in each stage of a request"))
+metrics_registry.register(Gauge(
+    "db_circuit_breaker_open", lambda: int(db_circuit_breaker.current_state != "closed"),
+    "1 while db_circuit_breaker is open or half-open"))
+db_bulkheads = tuple(b for b in (db_write_bulkhead, db_read_bulkhead) if b is not None)
+if db_bulkheads:
+    metrics_registry.register(BulkheadMetric(
+        "db_bulkhead_in_flight", "gauge", "in_flight", db_bulkheads,
+        "Request threads currently inside a db_service call"))
+    metrics_registry.register(BulkheadMetric(
+        "db_bulkhead_max_concurrent", "gauge", "max_concurrent", db_bulkheads,
+        "Concurrent db_service calls allowed per bulkhead"))
+    metrics_registry.register(BulkheadMetric(
+        "db_bulkhead_rejections_total", "counter", "rejected", db_bulkheads,
+        "db_service calls rejected because the bulkhead was full"))
+metrics_registry.register(Gauge(
+    "fallback_buffer_size", lambda: len(prediction_cache),
+    "Predictions waiting in the local fallback buffer"))
+metrics_registry.register(Gauge(
+    "fallback_buffer_dropped_total", lambda: prediction_cache.dropped,
+    "Predictions lost because the fallback buffer was full", kind="counter"))
+if micro_batcher is not None:
+    metrics_registry.register(micro_batcher.batch_size_histogram)
+    metrics_registry.register(micro_batcher.queue_wait_histogram)
+if write_behind is not None:
+    metrics_registry.register(write_behind.flush_latency_histogram)
+    metrics_registry.register(Gauge(
+        "write_behind_queue_depth", lambda: write_behind.stats()["queue_depth"],
+        "Records waiting to be flushed to the db_service"))
+
+PREDICT_PARSE = stage_latency.labels("predict", "parse")
+PREDICT_INFERENCE = stage_latency.labels("predict", "inference")
+PREDICT_DB = stage_latency.labels("predict", "db")
+PREDICT_RENDER = stage_latency.labels("predict", "render")
+SHOW_RESULT_DB = stage_latency.labels("show_result", "db")
+SHOW_RESULT_RENDER = stage_latency.labels("show_result", "render")
+
+
+@app.before_request
+def count_request():
+    worker_stats.record_request()
+    sync_model()
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request_metrics(response):
+    route = request.url_rule.rule if request.url_rule else "<unmatched>"
+    request_counter.inc(route, request.method, response.status_code)
+    started = g.get("request_started")
+    if started is not None:
+        request_latency.labels(route).observe(time.perf_counter() - started)
+    return response
+
+
 @app.route('/')
 def home():
     return render_template('index.html')
@@ -49,16 +384,18 @@ def home():
 @app.route('/predict', methods=['GET', 'POST'])
 def predict():
     if request.method == 'POST':
-        sepal_length = float(request.form['sepal_length'])
-        sepal_width = float(request.form['sepal_width'])
-        petal_length = float(request.form['petal_length'])
-        petal_width = float(request.form['petal_width'])
+        with PREDICT_PARSE.time():
+            sepal_length = float(request.form['sepal_length'])
+            sepal_width = float(request.form['sepal_width'])
+            petal_length = float(request.form['petal_length'])
+            petal_width = float(request.form['petal_width'])
 
-        features = np.array(
-            [sepal_length, sepal_width, petal_length, petal_width])
-        features = features.reshape(1, -1)
-        pred = model.predict(features)
-        flower_name = iris_classes[pred[0]]
+            features = np.array(
+                [sepal_length, sepal_width, petal_length, petal_width])
+
+        with PREDICT_INFERENCE.time():
+            pred = predict_one(features)
+        flower_name = iris_classes[pred]
 
         prediction_data = {
             "sepal_length": sepal_length,
@@ -68,32 +405,98 @@ def predict():
             "predicted_class": flower_name
         }
 
-        result = save_to_database(prediction_data)
+        with PREDICT_DB.time():
+            result = persist_prediction(prediction_data)
 
         if result.get("cached"):
-            prediction_cache.append(prediction_data)
-            logger.warning("Prediction saved to local cache")
+            if prediction_cache.append(prediction_data):
+                logger.warning("Prediction saved to fallback buffer")
+            else:
+                # drop_newest policy; the buffer has counted the drop.
+                logger.warning("Fallback buffer full, prediction dropped")
 
-        return render_template('index.html',
-                               prediction=flower_name,
-                               db_status=result.get("status"),
-                               hostname=socket.gethostname())
+        with PREDICT_RENDER.time():
+            return render_template('index.html',
+                                   prediction=flower_name,
+                                   db_status=result.get("status"),
+                                   hostname=socket.gethostname())
     else:
         return redirect(location='/')
 
 
+def parse_feature_rows(req):
+    if req.mimetype == 'text/csv':
+        text = req.get_data(as_text=True)
+        rows = [row for row in csv.reader(io.StringIO(text)) if row]
+        if rows and rows[0] == FEATURE_NAMES:
+            rows = rows[1:]
+    else:
+        payload = req.get_json(silent=True)
+        if isinstance(payload, dict):
+            payload = payload.get('instances')
+        if not isinstance(payload, list):
+            raise ValueError(
+                "Expected a JSON list of feature rows or {\"instances\": [...]}")
+        rows = [[row[name] for name in FEATURE_NAMES]
+                if isinstance(row, dict) else row for row in payload]
+
+    if not rows:
+        raise ValueError("No feature rows supplied")
+    if len(rows) > MAX_BATCH_ROWS:
+        raise ValueError(f"Batch exceeds {MAX_BATCH_ROWS} rows")
+
+    features = np.asarray(rows, dtype=float)
+    if features.ndim != 2 or features.shape[1] != len(FEATURE_NAMES):
+        raise ValueError(
+            f"Each row must have {len(FEATURE_NAMES)} features: {', '.join(FEATURE_NAMES)}")
+    finite = np.isfinite(features).all(axis=1)
+    if not finite.all():
+        raise ValueError(f"Row {int(np.argmin(finite))} contains NaN or infinity")
+    return features
+
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    try:
+        features = parse_feature_rows(request)
+    except (ValueError, KeyError, TypeError) as e:
+        return jsonify({"error": f"Invalid batch: {str(e)}"}), 400
+
+    current = loaded_model
+    pred = current.model.predict(features)
+    labels = current.class_labels[np.searchsorted(current.model.classes_, pred)]
+
+    return jsonify({
+        "count": len(labels),
+        "predictions": labels.tolist(),
+        "hostname": socket.gethostname()
+    })
+
+
+@app.route('/model/reload', methods=['POST'])
+def model_reload():
+    try:
+        generation = reload_model()
+    except Exception as e:
+        logger.error(f"Failed to reload model: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+    return jsonify({"status": "ok", "model_path": model_path, "generation": generation})
+
+
 @app.route('/show-result')
 def show_result():
     try:
-        records = get_from_database()
-        return render_template('show-result.html',
-                               records=records,
-                               degraded=False,
-                               hostname=socket.gethostname())
+        with SHOW_RESULT_DB.time():
+            records = read_records()
+        with SHOW_RESULT_RENDER.time():
+            return render_template('show-result.html',
+                                   records=records,
+                                   degraded=False,
+                                   hostname=socket.gethostname())
     except Exception as e:
         logger.error(f"Failed to fetch records: {str(e)}")
         return render_template('show-result.html',
-                               records=prediction_cache,
+                               records=prediction_cache.snapshot(),
                                degraded=True,
                                hostname=socket.gethostname())
 
@@ -112,14 +515,53 @@ def health():
     })
 
 
+def wants_prometheus():
+    if request.args.get("format") == "prometheus":
+        return True
+    # Prometheus scrapers ask for OpenMetrics or text/plain; browsers, curl
+    # and the existing JSON clients keep getting JSON.
+    accept = request.headers.get("Accept", "")
+    return "openmetrics-text" in accept or accept.startswith("text/plain")
+
+
+@app.route('/metrics/prometheus')
+def metrics_prometheus():
+    return Response(metrics_registry.render_prometheus(),
+                    content_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.route('/metrics')
 def metrics():
+    if wants_prometheus():
+        return metrics_prometheus()
     return jsonify({
         "hostname": socket.gethostname(),
         "circuit_breaker_state": db_circuit_breaker.current_state,
         "failure_count": db_circuit_breaker.fail_counter,
         "success_count": db_circuit_breaker.success_counter,
-        "cache_size": len(prediction_cache)
+        "circuit_breaker_window": getattr(db_circuit_breaker, "window_stats", dict)(),
+        "cache_size": len(prediction_cache),
+        "db_http_pool": db_client.stats(),
+        "bulkheads": {b.name: b.stats() for b in db_bulkheads} if db_bulkheads else {"enabled": False},
+        "read_cache": records_cache.stats() if records_cache else {"enabled": False},
+        "db_read": {
+            "deadline_seconds": DB_READ_DEADLINE,
+            "retry_budget": read_retry_budget.stats(),
+            "hedging": DB_HEDGE_ENABLED,
+            "p95_seconds": read_latency.percentile(0.95)
+        },
+        "worker_pid": os.getpid(),
+        "model_load_seconds": MODEL_LOAD_SECONDS,
+        "model_generation": loaded_model.generation,
+        "workers": worker_stats.snapshot(),
+        "fallback_buffer": {**prediction_cache.stats(), **buffer_replayer.stats()},
+        "memo_cache_hits": memo_cache.hits if memo_cache else 0,
+        "memo_cache_misses": memo_cache.misses if memo_cache else 0,
+        "memo_cache_size": len(memo_cache) if memo_cache else 0,
+        "micro_batch": micro_batcher.stats() if micro_batcher else {"enabled": False},
+        "write_behind": write_behind.stats() if write_behind else {"enabled": False},
+        "requests": request_counter.snapshot(),
+        "latency_seconds": stage_latency.snapshot()
     })
 
 
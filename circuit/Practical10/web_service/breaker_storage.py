@@ -0,0 +1,110 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+import pybreaker
+
+
+class CircuitSQLiteStorage(pybreaker.CircuitBreakerStorage):
+    """pybreaker storage backed by a local SQLite file.
+
+    Every worker process on the host that points at the same file sees the
+    same state, counters and open timestamp, so they trip and recover
+    together. Connections are per thread and per process; the database runs
+    in WAL mode with autocommit so each update is a single short write.
+    """
+
+    def __init__(self, state, path, namespace="db_service_breaker", busy_timeout=1.0):
+        super().__init__("sqlite")
+        self.path = path
+        self.namespace = namespace
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("INSERT OR IGNORE INTO breaker_state (name, state) VALUES (?, ?)",
+                         (namespace, state))
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                   isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS breaker_state (
+                    name TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    counter INTEGER NOT NULL DEFAULT 0,
+                    success_counter INTEGER NOT NULL DEFAULT 0,
+                    opened_at REAL
+                )
+            """)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _get(self, column):
+        row = self._connection().execute(
+            f"SELECT {column} FROM breaker_state WHERE name = ?", (self.namespace,)).fetchone()
+        return row[0] if row else None
+
+    def _set(self, assignment, *params):
+        self._connection().execute(
+            f"UPDATE breaker_state SET {assignment} WHERE name = ?", (*params, self.namespace))
+
+    @property
+    def state(self):
+        return self._get("state") or pybreaker.STATE_CLOSED
+
+    @state.setter
+    def state(self, state):
+        self._set("state = ?", state)
+
+    def increment_counter(self):
+        self._set("counter = counter + 1")
+
+    def reset_counter(self):
+        self._set("counter = 0")
+
+    def increment_success_counter(self):
+        self._set("success_counter = success_counter + 1")
+
+    def reset_success_counter(self):
+        self._set("success_counter = 0")
+
+    @property
+    def counter(self):
+        return self._get("counter") or 0
+
+    @property
+    def success_counter(self):
+        return self._get("success_counter") or 0
+
+    @property
+    def opened_at(self):
+        timestamp = self._get("opened_at")
+        if timestamp is None:
+            return None
+        return datetime.fromtimestamp(timestamp, timezone.utc)
+
+    @opened_at.setter
+    def opened_at(self, now):
+        self._set("opened_at = ?", now.timestamp())
+
+
+def make_state_storage(backend, name):
+    if backend == "memory":
+        return None
+    if backend == "sqlite":
+        path = os.getenv("DB_BREAKER_STATE_PATH", "/tmp/db_breaker_state.db")
+        return CircuitSQLiteStorage(pybreaker.STATE_CLOSED, path, namespace=name)
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise ValueError(
+                "DB_BREAKER_STATE_BACKEND=redis needs the redis package "
+                "(pip install redis)") from None
+        client = redis.from_url(os.getenv("DB_BREAKER_REDIS_URL", "redis://localhost:6379/0"))
+        return pybreaker.CircuitRedisStorage(pybreaker.STATE_CLOSED, client, namespace=name)
+    raise ValueError(f"Unknown DB_BREAKER_STATE_BACKEND {backend!r}")
@@ -0,0 +1,77 @@
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BulkheadFullError(RuntimeError):
+    pass
+
+
+class Bulkhead:
+    """Caps how many threads can be inside calls to one dependency at a time.
+
+    Use as a context manager. Entering waits up to ``max_wait`` seconds for a
+    free slot and raises ``BulkheadFullError`` if none frees up, so a slow
+    dependency ties up at most ``max_concurrent`` request threads.
+    """
+
+    def __init__(self, name, max_concurrent, max_wait=0.0):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1")
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.accepted = 0
+        self.rejected = 0
+
+    def __enter__(self):
+        if not self._semaphore.acquire(timeout=self.max_wait):
+            with self._lock:
+                self.rejected += 1
+            raise BulkheadFullError(
+                f"Bulkhead {self.name} is full ({self.max_concurrent} calls in flight)")
+        with self._lock:
+            self.in_flight += 1
+            self.accepted += 1
+            self.peak = max(self.peak, self.in_flight)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        with self._lock:
+            self.in_flight -= 1
+        self._semaphore.release()
+        return False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_wait_seconds": self.max_wait,
+                "in_flight": self.in_flight,
+                "peak": self.peak,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "saturation": self.in_flight / self.max_concurrent
+            }
+
+
+class BulkheadMetric:
+    """Exposes one field of ``Bulkhead.stats()`` for several bulkheads as a
+    single Prometheus family labelled by bulkhead name."""
+
+    def __init__(self, name, kind, field, bulkheads, description=""):
+        self.name = name
+        self.kind = kind
+        self.field = field
+        self.bulkheads = list(bulkheads)
+        self.description = description
+
+    def collect(self):
+        samples = [("", {"bulkhead": b.name}, b.stats()[self.field])
+                   for b in self.bulkheads]
+        return self.name, self.kind, self.description, samples
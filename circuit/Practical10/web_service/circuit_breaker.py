@@ -1,23 +1,302 @@
+import os
+import time
+import threading
 import pybreaker
 import logging
+from collections import deque, namedtuple
+from datetime import datetime, timezone
 from functools import wraps
+from breaker_storage import make_state_storage
+from bulkhead import BulkheadFullError
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-db_circuit_breaker = pybreaker.CircuitBreaker(
-    fail_max=3,
-    reset_timeout=30,
-    exclude=[ValueError],
-    name="db_service_breaker"
-)
+BreakerState = namedtuple("BreakerState", ["name"])
 
 
-def handle_db_failure(func):
+class CountWindow:
+    def __init__(self, size):
+        self._calls = deque(maxlen=size)
+
+    def record(self, failed, slow, now):
+        self._calls.append((failed, slow))
+
+    def totals(self, now):
+        failures = sum(1 for failed, _ in self._calls if failed)
+        slow = sum(1 for _, is_slow in self._calls if is_slow)
+        return len(self._calls), failures, slow
+
+
+class TimeWindow:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self._buckets = deque()
+
+    def record(self, failed, slow, now):
+        second = int(now)
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0, 0])
+        bucket = self._buckets[-1]
+        bucket[1] += 1
+        bucket[2] += failed
+        bucket[3] += slow
+
+    def totals(self, now):
+        oldest = int(now) - self.seconds
+        while self._buckets and self._buckets[0][0] <= oldest:
+            self._buckets.popleft()
+        return (sum(b[1] for b in self._buckets),
+                sum(b[2] for b in self._buckets),
+                sum(b[3] for b in self._buckets))
+
+
+class SlidingWindowCircuitBreaker:
+    """Circuit breaker that trips on failure rate and slow-call rate.
+
+    Outcomes are kept in a count-based (last ``window_size`` calls) or
+    time-based (last ``window_size`` seconds) sliding window. Once the window
+    holds at least ``minimum_calls`` outcomes, the breaker opens when either
+    rate reaches its threshold. A call is slow when it takes longer than
+    ``slow_call_duration`` seconds, whether or not it succeeds. While
+    half-open only ``half_open_max_calls`` trial calls are let through and
+    their combined outcome decides whether to close or re-open.
+
+    Exposes the parts of the ``pybreaker.CircuitBreaker`` interface the web
+    service uses, and raises ``pybreaker.CircuitBreakerError`` when a call is
+    rejected.
+    """
+
+    def __init__(self, window_type="count", window_size=20, minimum_calls=10,
+                 failure_rate_threshold=0.5, slow_call_rate_threshold=0.5,
+                 slow_call_duration=2.0, reset_timeout=30, half_open_max_calls=3,
+                 exclude=None, listeners=None, state_storage=None, name=None,
+                 clock=time.time):
+        if window_type not in ("count", "time"):
+            raise ValueError(f"Unknown window type {window_type!r}")
+        self.window_type = window_type
+        self.window_size = window_size
+        self.minimum_calls = minimum_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.name = name
+        self.clock = clock
+        self._excluded_exceptions = list(exclude or [])
+        self._listeners = list(listeners or [])
+        self._state_storage = state_storage or pybreaker.CircuitMemoryStorage(
+            pybreaker.STATE_CLOSED)
+        self._lock = threading.RLock()
+        self._generation = 0
+        self._known_state = self._state_storage.state
+        self._window = self._new_window()
+        self._half_open_started = 0
+        self._half_open_results = []
+
+    @property
+    def current_state(self):
+        return self._state_storage.state
+
+    @property
+    def fail_counter(self):
+        with self._lock:
+            return self._window.totals(self.clock())[1]
+
+    @property
+    def success_counter(self):
+        with self._lock:
+            calls, failures, _ = self._window.totals(self.clock())
+            return calls - failures
+
+    @property
+    def listeners(self):
+        return tuple(self._listeners)
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def is_system_error(self, exception):
+        return not any(isinstance(exception, excluded)
+                       for excluded in self._excluded_exceptions)
+
+    def window_stats(self):
+        with self._lock:
+            calls, failures, slow = self._window.totals(self.clock())
+        return {
+            "window_type": self.window_type,
+            "window_size": self.window_size,
+            "calls": calls,
+            "failure_rate": failures / calls if calls else 0.0,
+            "slow_call_rate": slow / calls if calls else 0.0
+        }
+
+    def open(self):
+        with self._lock:
+            self._state_storage.opened_at = datetime.fromtimestamp(
+                self.clock(), timezone.utc)
+            return self._transition(pybreaker.STATE_OPEN)
+
+    def half_open(self):
+        with self._lock:
+            return self._transition(pybreaker.STATE_HALF_OPEN)
+
+    def close(self):
+        with self._lock:
+            return self._transition(pybreaker.STATE_CLOSED)
+
+    def call(self, func, *args, **kwargs):
+        generation, state = self._acquire_permission()
+        for listener in self._listeners:
+            listener.before_call(self, func, *args, **kwargs)
+
+        started = self.clock()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            failed = self.is_system_error(e)
+            tripped = self._record(generation, state, failed, self.clock() - started)
+            for listener in self._listeners:
+                if failed:
+                    listener.failure(self, e)
+                else:
+                    listener.success(self)
+            if tripped:
+                raise pybreaker.CircuitBreakerError(
+                    "Failure rate threshold reached, circuit breaker opened") from e
+            raise
+
+        self._record(generation, state, False, self.clock() - started)
+        for listener in self._listeners:
+            listener.success(self)
+        return result
+
+    def _new_window(self):
+        if self.window_type == "time":
+            return TimeWindow(self.window_size)
+        return CountWindow(self.window_size)
+
+    def _transition(self, new_state):
+        old_state = self._known_state
+        self._state_storage.state = new_state
+        self._reset_local(old_state, new_state)
+        return True
+
+    def _reset_local(self, old_state, new_state):
+        self._known_state = new_state
+        self._generation += 1
+        self._window = self._new_window()
+        self._half_open_started = 0
+        self._half_open_results = []
+        logger.warning(f"Circuit breaker {self.name} {old_state} -> {new_state}")
+        for listener in self._listeners:
+            listener.state_change(self, BreakerState(old_state), BreakerState(new_state))
+
+    def _acquire_permission(self):
+        with self._lock:
+            state = self.current_state
+            if state != self._known_state:
+                # Another process sharing the state storage moved the breaker.
+                self._reset_local(self._known_state, state)
+            if state == pybreaker.STATE_OPEN:
+                opened_at = self._state_storage.opened_at
+                if opened_at and self.clock() < opened_at.timestamp() + self.reset_timeout:
+                    raise pybreaker.CircuitBreakerError(
+                        "Timeout not elapsed yet, circuit breaker still open")
+                self._transition(pybreaker.STATE_HALF_OPEN)
+                state = pybreaker.STATE_HALF_OPEN
+
+            if state == pybreaker.STATE_HALF_OPEN:
+                if self._half_open_started >= self.half_open_max_calls:
+                    raise pybreaker.CircuitBreakerError(
+                        "Half-open trial calls exhausted, circuit breaker still open")
+                self._half_open_started += 1
+            return self._generation, state
+
+    def _record(self, generation, state, failed, duration):
+        slow = duration >= self.slow_call_duration
+        with self._lock:
+            if generation != self._generation:
+                # The breaker changed state while this call was in flight.
+                return False
+
+            if state == pybreaker.STATE_HALF_OPEN:
+                results = self._half_open_results
+                results.append((failed, slow))
+                if self._rates_exceeded(len(results),
+                                        sum(f for f, _ in results),
+                                        sum(s for _, s in results)):
+                    return self.open()
+                if len(results) >= self.half_open_max_calls:
+                    self.close()
+                return False
+
+            now = self.clock()
+            self._window.record(failed, slow, now)
+            calls, failures, slow_calls = self._window.totals(now)
+            if calls >= self.minimum_calls and self._rates_exceeded(calls, failures, slow_calls):
+                return self.open()
+            return False
+
+    def _rates_exceeded(self, calls, failures, slow_calls):
+        return (failures / calls >= self.failure_rate_threshold or
+                slow_calls / calls >= self.slow_call_rate_threshold)
+
+
+def make_db_circuit_breaker():
+    mode = os.getenv("DB_BREAKER_MODE", "consecutive")
+    state_storage = make_state_storage(
+        os.getenv("DB_BREAKER_STATE_BACKEND", "memory"), "db_service_breaker")
+    if mode == "consecutive":
+        return pybreaker.CircuitBreaker(
+            fail_max=3,
+            reset_timeout=30,
+            exclude=[ValueError],
+            state_storage=state_storage,
+            name="db_service_breaker"
+        )
+    if mode == "sliding_window":
+        return SlidingWindowCircuitBreaker(
+            window_type=os.getenv("DB_BREAKER_WINDOW_TYPE", "count"),
+            window_size=int(os.getenv("DB_BREAKER_WINDOW_SIZE", "20")),
+            minimum_calls=int(os.getenv("DB_BREAKER_MIN_CALLS", "10")),
+            failure_rate_threshold=float(os.getenv("DB_BREAKER_FAILURE_RATE", "0.5")),
+            slow_call_rate_threshold=float(os.getenv("DB_BREAKER_SLOW_CALL_RATE", "0.5")),
+            slow_call_duration=float(os.getenv("DB_BREAKER_SLOW_CALL_SECONDS", "2.0")),
+            reset_timeout=30,
+            half_open_max_calls=int(os.getenv("DB_BREAKER_HALF_OPEN_CALLS", "3")),
+            exclude=[ValueError],
+            state_storage=state_storage,
+            name="db_service_breaker"
+        )
+    raise ValueError(f"Unknown DB_BREAKER_MODE {mode!r}")
+
+
+db_circuit_breaker = make_db_circuit_breaker()
+
+
+def handle_db_failure(func=None, *, bulkhead=None):
+    """Runs ``func`` through ``db_circuit_breaker`` and turns failures into
+    degraded results. With a ``bulkhead``, calls that cannot get a slot
+    degrade straight away instead of queueing behind a slow database."""
+    if func is None:
+        return lambda f: handle_db_failure(f, bulkhead=bulkhead)
+
     @wraps(func)
     def wrapper(*args, **kwargs):
         try:
-            return db_circuit_breaker.call(func, *args, **kwargs)
+            if bulkhead is None:
+                return db_circuit_breaker.call(func, *args, **kwargs)
+            with bulkhead:
+                return db_circuit_breaker.call(func, *args, **kwargs)
+        except BulkheadFullError:
+            logger.error(f"Bulkhead {bulkhead.name} full for {func.__name__}")
+            return {
+                "status": "degraded",
+                "message": "Database service is saturated",
+                "cached": True
+            }
         except pybreaker.CircuitBreakerError:
             logger.error(f"Circuit breaker OPEN for {func.__name__}")
             return {
@@ -0,0 +1,126 @@
+"""Compile a pickled scikit-learn classifier into a NumPy-only evaluator.
+
+    python compiled_model.py model.pkl model.npz
+
+The .npz file holds only plain arrays, and ``CompiledModel.predict`` skips
+sklearn's input validation and estimator dispatch. Point MODEL_PATH at the
+.npz file to serve it instead of the pickle.
+"""
+import sys
+import pickle
+
+import numpy as np
+
+
+def compile_model(estimator):
+    classes = np.asarray(estimator.classes_)
+
+    if hasattr(estimator, "theta_") and hasattr(estimator, "var_"):
+        return {
+            "kind": np.array("gaussian_nb"),
+            "classes": classes,
+            "theta": estimator.theta_,
+            "var": estimator.var_,
+            "log_prior_term": np.log(estimator.class_prior_)
+            - 0.5 * np.sum(np.log(2.0 * np.pi * estimator.var_), axis=1)
+        }
+
+    if hasattr(estimator, "tree_"):
+        tree = estimator.tree_
+        return {
+            "kind": np.array("decision_tree"),
+            "classes": classes,
+            "children_left": tree.children_left,
+            "children_right": tree.children_right,
+            "feature": tree.feature,
+            "threshold": tree.threshold,
+            "leaf_class": np.argmax(tree.value[:, 0, :], axis=1),
+            "max_depth": np.array(tree.max_depth)
+        }
+
+    if hasattr(estimator, "coef_") and hasattr(estimator, "intercept_"):
+        return {
+            "kind": np.array("linear"),
+            "classes": classes,
+            "coef": np.atleast_2d(estimator.coef_),
+            "intercept": np.atleast_1d(estimator.intercept_)
+        }
+
+    raise ValueError(f"Cannot compile estimator of type {type(estimator).__name__}")
+
+
+class CompiledModel:
+    def __init__(self, arrays):
+        self.kind = str(arrays["kind"])
+        self.classes_ = arrays["classes"]
+        self._arrays = {name: arrays[name] for name in arrays}
+        self._predict_indices = {
+            "gaussian_nb": self._gaussian_nb,
+            "decision_tree": self._decision_tree,
+            "linear": self._linear
+        }[self.kind]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as arrays:
+            return cls(arrays)
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return self.classes_[self._predict_indices(X)]
+
+    def _gaussian_nb(self, X):
+        a = self._arrays
+        # Same expression as GaussianNB._joint_log_likelihood, so ties and
+        # rounding resolve the same way.
+        sq = ((X[:, np.newaxis, :] - a["theta"]) ** 2) / a["var"]
+        jll = a["log_prior_term"] - 0.5 * np.sum(sq, axis=2)
+        return np.argmax(jll, axis=1)
+
+    def _decision_tree(self, X):
+        a = self._arrays
+        # sklearn trees compare float32 features against their thresholds.
+        X = X.astype(np.float32)
+        rows = np.arange(X.shape[0])
+        node = np.zeros(X.shape[0], dtype=np.intp)
+        for _ in range(int(a["max_depth"])):
+            left = a["children_left"][node]
+            is_leaf = left == -1
+            go_left = X[rows, np.maximum(a["feature"][node], 0)] <= a["threshold"][node]
+            node = np.where(is_leaf, node,
+                            np.where(go_left, left, a["children_right"][node]))
+        return a["leaf_class"][node]
+
+    def _linear(self, X):
+        a = self._arrays
+        scores = X @ a["coef"].T + a["intercept"]
+        if scores.shape[1] == 1:
+            return (scores[:, 0] > 0).astype(np.intp)
+        return np.argmax(scores, axis=1)
+
+
+def main(argv):
+    if len(argv) != 3:
+        print(f"usage: {argv[0]} MODEL.pkl OUTPUT.npz")
+        return 2
+
+    with open(argv[1], 'rb') as f:
+        estimator = pickle.load(f)
+    arrays = compile_model(estimator)
+    compiled = CompiledModel(arrays)
+
+    rng = np.random.default_rng(0)
+    sample = rng.uniform(0.0, 8.0, size=(10000, estimator.n_features_in_))
+    if not np.array_equal(compiled.predict(sample), estimator.predict(sample)):
+        print("Compiled model disagrees with the estimator, not writing output")
+        return 1
+
+    np.savez(argv[2], **arrays)
+    print(f"Wrote {compiled.kind} evaluator to {argv[2]}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,49 @@
+import gc
+import os
+import time
+import logging
+
+logger = logging.getLogger("gunicorn.error")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+keepalive = 5
+
+# Import app.py (and unpickle the model) once in the master. Workers inherit
+# the loaded model copy-on-write instead of each loading their own copy.
+preload_app = True
+
+_server_started_at = time.monotonic()
+_forked_at = None
+
+
+def when_ready(server):
+    logger.info(
+        f"Server ready in {time.monotonic() - _server_started_at:.3f}s "
+        f"with {server.num_workers} workers")
+
+
+def pre_fork(server, worker):
+    # Move everything allocated so far out of the collector's reach, so
+    # collections in the workers do not touch (and copy) the shared pages.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    global _forked_at
+    _forked_at = time.monotonic()
+
+
+def post_worker_init(worker):
+    from app import worker_stats
+    boot_seconds = time.monotonic() - _forked_at
+    worker_stats.register_worker(boot_seconds=boot_seconds)
+    worker.log.info(f"Worker {worker.pid} ready in {boot_seconds:.3f}s")
+
+
+def child_exit(server, worker):
+    from app import worker_stats
+    worker_stats.release_worker(worker.pid)
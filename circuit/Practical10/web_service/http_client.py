@@ -0,0 +1,59 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class PooledHTTPClient:
+    """Keep-alive HTTP client shared by all request threads.
+
+    Each thread gets its own ``requests.Session`` (sessions are not
+    thread-safe), but every session is mounted on the same ``HTTPAdapter`` so
+    they all draw from a single urllib3 connection pool.
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=1.0, read_timeout=5.0):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self._local = threading.local()
+
+    @property
+    def session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.mount("http://", self.adapter)
+            session.mount("https://", self.adapter)
+            self._local.session = session
+        return session
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stats(self):
+        pools = self.adapter.poolmanager.pools
+        created = requests_sent = idle = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            created += pool.num_connections
+            requests_sent += pool.num_requests
+            idle += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+        return {
+            "pool_size": self.pool_size,
+            "connect_timeout": self.timeout[0],
+            "read_timeout": self.timeout[1],
+            "connections_created": created,
+            "connections_reused": max(requests_sent - created, 0),
+            "requests": requests_sent,
+            "idle_connections": idle
+        }
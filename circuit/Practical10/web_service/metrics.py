@@ -0,0 +1,190 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                           0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def latency_buckets_from_env(name="METRICS_LATENCY_BUCKETS"):
+    value = os.getenv(name)
+    if not value:
+        return DEFAULT_LATENCY_BUCKETS
+    return tuple(float(bound) for bound in value.split(","))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name, buckets, description="", labels=None):
+        self.name = name
+        self.description = description
+        self.labels = dict(labels or {})
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+
+        cumulative = 0
+        buckets = {}
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = count
+        return {"buckets": buckets, "count": count, "sum": total}
+
+    def samples(self):
+        snapshot = self.snapshot()
+        for bound, cumulative in snapshot["buckets"].items():
+            yield "_bucket", {**self.labels, "le": bound}, cumulative
+        yield "_sum", self.labels, snapshot["sum"]
+        yield "_count", self.labels, snapshot["count"]
+
+    def collect(self):
+        return self.name, "histogram", self.description, list(self.samples())
+
+
+class HistogramFamily:
+    """A set of histograms sharing a name and buckets, split by labels."""
+
+    def __init__(self, name, buckets, label_names, description=""):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = Histogram(self.name, self.buckets, self.description,
+                                      dict(zip(self.label_names, values)))
+                    self._children[values] = child
+        return child
+
+    def snapshot(self):
+        return {"/".join(map(str, values)): child.snapshot()
+                for values, child in list(self._children.items())}
+
+    def collect(self):
+        samples = [sample for child in list(self._children.values())
+                   for sample in child.samples()]
+        return self.name, "histogram", self.description, samples
+
+
+class CounterFamily:
+    def __init__(self, name, label_names, description=""):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *values, amount=1):
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return {"/".join(map(str, values)): count
+                    for values, count in self._values.items()}
+
+    def collect(self):
+        with self._lock:
+            samples = [("", dict(zip(self.label_names, values)), count)
+                       for values, count in self._values.items()]
+        return self.name, "counter", self.description, samples
+
+
+class Gauge:
+    """Gauge whose value is read from ``fn`` at scrape time.
+
+    Pass ``kind="counter"`` when ``fn`` reads a count that only goes up,
+    such as a total kept by the component itself.
+    """
+
+    def __init__(self, name, fn, description="", kind="gauge"):
+        self.name = name
+        self.fn = fn
+        self.description = description
+        self.kind = kind
+
+    def collect(self):
+        return self.name, self.kind, self.description, [("", {}, self.fn())]
+
+
+class MetricsRegistry:
+    """Metrics of the current process, rendered in the Prometheus text format.
+
+    Values live in process memory, so under a multi-worker server each
+    scrape only sees the worker that happened to answer it. ``const_labels``
+    is called on every render and its labels are added to every sample;
+    label each worker separately so its series never mix with another
+    worker's, and sum them in the query. Workers that were not scraped
+    recently simply have stale series, and a restarted worker starts a new
+    series from zero.
+    """
+
+    def __init__(self, const_labels=None):
+        self._metrics = []
+        self._const_labels = const_labels
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render_prometheus(self):
+        const_labels = self._const_labels() if self._const_labels else {}
+        lines = []
+        for metric in self._metrics:
+            name, kind, description, samples = metric.collect()
+            if description:
+                lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                labels = {**const_labels, **labels}
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
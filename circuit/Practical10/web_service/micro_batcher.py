@@ -0,0 +1,105 @@
+import os
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future
+
+import numpy as np
+
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+QUEUE_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005,
+                      0.01, 0.025, 0.05, 0.1, 0.25)
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-row predictions into one model call.
+
+    The first queued request opens a batching window of ``max_wait``
+    seconds; the batch is dispatched when the window closes or
+    ``max_batch_size`` rows have arrived, whichever comes first.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait=0.005):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batch_size_histogram = Histogram(
+            "micro_batch_size", BATCH_SIZE_BUCKETS,
+            "Rows per stacked model.predict call")
+        self.queue_wait_histogram = Histogram(
+            "micro_batch_queue_wait_seconds", QUEUE_WAIT_BUCKETS,
+            "Time a request waited before its batch was dispatched")
+        self._queue = queue.Queue()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def predict(self, features, timeout=None):
+        self._ensure_started()
+        future = Future()
+        self._queue.put((features, time.perf_counter(), future))
+        return future.result(timeout=timeout)
+
+    def stats(self):
+        return {
+            "enabled": True,
+            "max_batch_size": self.max_batch_size,
+            "window_ms": self.max_wait * 1000,
+            "pending": self._queue.qsize(),
+            "batch_size": self.batch_size_histogram.snapshot(),
+            "queue_wait_seconds": self.queue_wait_histogram.snapshot()
+        }
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so a worker process has to start its own.
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name="micro-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = batch[0][1] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            dispatched_at = time.perf_counter()
+            for _, enqueued_at, _ in batch:
+                self.queue_wait_histogram.observe(dispatched_at - enqueued_at)
+            self.batch_size_histogram.observe(len(batch))
+
+            try:
+                predictions = self.predict_fn(
+                    np.vstack([features for features, _, _ in batch]))
+                if len(predictions) != len(batch):
+                    raise ValueError(
+                        f"Model returned {len(predictions)} predictions for {len(batch)} rows")
+            except Exception as e:
+                # Fail every request in the batch; none may be left waiting.
+                logger.error(f"Micro-batch of {len(batch)} failed: {str(e)}")
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, _, future), prediction in zip(batch, predictions):
+                future.set_result(prediction)
@@ -0,0 +1,110 @@
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+NOT_MODIFIED = object()
+
+
+class StaleWhileRevalidateCache:
+    """Single-value cache that serves stale data while it refreshes.
+
+    ``fetch_fn(etag)`` returns ``(value, etag)``, or ``(NOT_MODIFIED, etag)``
+    when the origin confirms the cached copy is still current. Within
+    ``max_age`` the cached value is returned as is; after that it is still
+    returned immediately while one background thread revalidates it.
+    ``invalidate`` forces the next ``get`` to revalidate before answering,
+    so a process sees its own writes.
+    """
+
+    def __init__(self, fetch_fn, max_age=5.0, clock=time.monotonic):
+        self.fetch_fn = fetch_fn
+        self.max_age = max_age
+        self.clock = clock
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.refresh_errors = 0
+        self._value = None
+        self._etag = None
+        self._fetched_at = None
+        self._invalidated = False
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            has_value = self._fetched_at is not None
+            if has_value and not self._invalidated:
+                if self.clock() - self._fetched_at <= self.max_age:
+                    self.hits += 1
+                    return self._value
+                self.stale_hits += 1
+                self._start_background_refresh()
+                return self._value
+            self.misses += 1
+
+        try:
+            return self._refresh()
+        except Exception as e:
+            if not has_value:
+                raise
+            logger.warning(f"Revalidation failed, serving cached copy: {str(e)}")
+            return self._value
+
+    def invalidate(self):
+        with self._lock:
+            self._invalidated = True
+
+    def stats(self):
+        with self._lock:
+            age = None if self._fetched_at is None else self.clock() - self._fetched_at
+            return {
+                "max_age": self.max_age,
+                "age": age,
+                "etag": self._etag,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "refresh_errors": self.refresh_errors
+            }
+
+    def _refresh(self):
+        with self._lock:
+            etag = self._etag if self._fetched_at is not None else None
+            was_invalidated, self._invalidated = self._invalidated, False
+        try:
+            value, new_etag = self.fetch_fn(etag)
+        except Exception:
+            with self._lock:
+                self.refresh_errors += 1
+                self._invalidated = self._invalidated or was_invalidated
+            raise
+
+        with self._lock:
+            if value is NOT_MODIFIED:
+                self.not_modified += 1
+            else:
+                self._value = value
+                self._etag = new_etag
+            self._fetched_at = self.clock()
+            return self._value
+
+    def _start_background_refresh(self):
+        if self._refreshing:
+            return
+        self._refreshing = True
+        threading.Thread(target=self._background_refresh,
+                         name="read-cache-refresh", daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            self._refresh()
+        except Exception as e:
+            logger.warning(f"Background revalidation failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing = False
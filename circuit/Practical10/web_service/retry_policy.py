@@ -0,0 +1,140 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from tenacity.stop import stop_base
+
+
+class Deadline:
+    def __init__(self, seconds, clock=time.monotonic):
+        self.clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - self.clock())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+
+class RetryBudget:
+    """Caps retries at a fraction of first attempts.
+
+    Every call deposits ``ratio`` tokens and every retry (or hedged request)
+    withdraws one, so with ``ratio=0.1`` retries stay at roughly 10% of
+    traffic however badly the dependency is failing. ``min_per_second``
+    tokens trickle in regardless of traffic so a quiet service can still
+    retry occasionally. The balance never exceeds ``max_tokens``.
+    """
+
+    def __init__(self, ratio=0.1, min_per_second=0.5, max_tokens=10, clock=time.monotonic):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self.clock = clock
+        self.requests = 0
+        self.retries = 0
+        self.rejected = 0
+        self._tokens = 0.0
+        self._refilled_at = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, deposit=0.0):
+        now = self.clock()
+        earned = (now - self._refilled_at) * self.min_per_second + deposit
+        self._tokens = min(self.max_tokens, self._tokens + earned)
+        self._refilled_at = now
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+            self._refill(self.ratio)
+
+    def try_withdraw(self):
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.retries += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def stats(self):
+        with self._lock:
+            self._refill()
+            return {
+                "ratio": self.ratio,
+                "tokens": self._tokens,
+                "requests": self.requests,
+                "retries": self.retries,
+                "rejected": self.rejected
+            }
+
+
+class stop_before_deadline(stop_base):
+    """Stop retrying when the next backoff would overrun the deadline."""
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+
+    def __call__(self, retry_state):
+        return retry_state.upcoming_sleep >= self.deadline.remaining()
+
+
+class stop_when_budget_exhausted(stop_base):
+    """Stop retrying when the retry budget has no tokens left.
+
+    Combine it last with ``|`` so a token is only spent on a retry that the
+    other stop conditions would allow.
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+
+    def __call__(self, retry_state):
+        return not self.budget.try_withdraw()
+
+
+class LatencyTracker:
+    def __init__(self, size=200, min_samples=20, default=0.5):
+        self.min_samples = min_samples
+        self.default = default
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q):
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return self.default
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def hedged_call(fn, executor, delay, budget, deadline):
+    """Run ``fn`` and, if it has not finished after ``delay`` seconds, race a
+    second copy against it. The hedge is paid for from ``budget``; the first
+    successful result wins.
+    """
+    primary = executor.submit(fn)
+    done, _ = wait([primary], timeout=min(delay, deadline.remaining()))
+    if done or not budget.try_withdraw():
+        return primary.result(timeout=deadline.remaining())
+
+    pending = {primary, executor.submit(fn)}
+    error = None
+    while pending:
+        done, pending = wait(pending, timeout=deadline.remaining(),
+                             return_when=FIRST_COMPLETED)
+        if not done:
+            raise TimeoutError("Deadline exceeded waiting for hedged request")
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
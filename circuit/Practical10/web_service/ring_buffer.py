@@ -0,0 +1,134 @@
+import threading
+import logging
+
+import numpy as np
+import pybreaker
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest")
+
+
+class PredictionRingBuffer:
+    """Fixed-capacity buffer of degraded-mode predictions.
+
+    Features are kept in one preallocated float array and the class as a
+    small integer index, so memory use is bounded by ``capacity`` no matter
+    how long the db_service stays unavailable. Positions are tracked as
+    absolute sequence numbers so a replay can acknowledge exactly the rows
+    it sent even if new rows arrived (or old ones were overwritten) meanwhile.
+    """
+
+    def __init__(self, capacity, field_names, class_names, overflow="drop_oldest"):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown overflow policy {overflow!r}, expected one of {OVERFLOW_POLICIES}")
+        self.capacity = capacity
+        self.field_names = list(field_names)
+        self.class_names = list(class_names)
+        self.overflow = overflow
+        self.dropped = 0
+        self._class_index = {name: i for i, name in enumerate(self.class_names)}
+        self._features = np.empty((capacity, len(self.field_names)), dtype=np.float64)
+        self._labels = np.empty(capacity, dtype=np.uint8)
+        self._start = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def append(self, record):
+        with self._lock:
+            if self._end - self._start >= self.capacity:
+                self.dropped += 1
+                if self.overflow == "drop_newest":
+                    return False
+                self._start += 1
+            slot = self._end % self.capacity
+            self._features[slot] = [record[name] for name in self.field_names]
+            self._labels[slot] = self._class_index[record["predicted_class"]]
+            self._end += 1
+        return True
+
+    def peek(self, limit=None):
+        with self._lock:
+            stop = self._end if limit is None else min(self._end, self._start + limit)
+            slots = np.arange(self._start, stop) % self.capacity
+            features = self._features[slots].tolist()
+            labels = self._labels[slots].tolist()
+        records = [dict(zip(self.field_names, row)) for row in features]
+        for record, label in zip(records, labels):
+            record["predicted_class"] = self.class_names[label]
+        return stop, records
+
+    def discard(self, until):
+        with self._lock:
+            self._start = max(self._start, min(until, self._end))
+
+    def snapshot(self):
+        return self.peek()[1]
+
+    def clear(self):
+        with self._lock:
+            self._start = self._end
+
+    def __len__(self):
+        return self._end - self._start
+
+    def stats(self):
+        return {
+            "size": len(self),
+            "capacity": self.capacity,
+            "overflow": self.overflow,
+            "dropped": self.dropped
+        }
+
+
+class BufferReplayer(pybreaker.CircuitBreakerListener):
+    """Replays a ``PredictionRingBuffer`` once its breaker is closed again.
+
+    Registered as a listener on the breaker; replay runs on a background
+    thread so the request that closed the breaker is not held up.
+    """
+
+    def __init__(self, buffer, flush_fn, breaker, batch_size=100):
+        self.buffer = buffer
+        self.flush_fn = flush_fn
+        self.breaker = breaker
+        self.batch_size = batch_size
+        self.replayed = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def state_change(self, cb, old_state, new_state):
+        if new_state.name == pybreaker.STATE_CLOSED and len(self.buffer):
+            self.start()
+
+    def success(self, cb):
+        if len(self.buffer) and cb.current_state == pybreaker.STATE_CLOSED:
+            self.start()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self.replay, name="buffer-replay", daemon=True)
+            self._thread.start()
+
+    def replay(self):
+        while len(self.buffer):
+            until, batch = self.buffer.peek(self.batch_size)
+            try:
+                self.breaker.call(self.flush_fn, batch)
+            except Exception as e:
+                logger.warning(
+                    f"Replay of {len(batch)} buffered predictions failed: {str(e)}")
+                return
+            self.buffer.discard(until)
+            self.replayed += len(batch)
+            logger.info(f"Replayed {len(batch)} buffered predictions")
+
+    def stats(self):
+        return {
+            "replayed": self.replayed,
+            "replaying": self._thread is not None and self._thread.is_alive()
+        }
@@ -0,0 +1,204 @@
+import os
+import time
+import threading
+import pytest
+import numpy as np
+import app as app_module
+from app import app
+from bulkhead import Bulkhead
+from retry_policy import RetryBudget
+from ring_buffer import PredictionRingBuffer
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+def test_home_route(client):
+    response = client.get('/')
+    assert response.status_code == 200
+
+
+def test_health_endpoint(client):
+    response = client.get('/health')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert 'status' in data
+    assert 'circuit_breaker' in data
+
+
+def test_metrics_endpoint(client):
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert 'circuit_breaker_state' in data
+    assert 'cache_size' in data
+    assert data['bulkheads'] == {'enabled': False}
+
+
+def test_metrics_prometheus_exposition(client):
+    client.get('/')
+    response = client.get('/metrics?format=prometheus')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    assert '# TYPE web_requests_total counter' in body
+    worker = f'worker="{os.getpid()}"'
+    assert 'web_requests_total{' + worker + ',route="/",method="GET",status="200"}' in body
+    assert '# TYPE web_stage_duration_seconds histogram' in body
+    assert 'db_bulkhead_in_flight' not in body
+
+
+def test_predict_batch_json(client):
+    rows = [[5.1, 3.5, 1.4, 0.2], [6.0, 2.7, 4.2, 1.3], [6.9, 3.1, 5.8, 2.3]]
+    response = client.post('/predict/batch', json=rows)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['count'] == 3
+    assert data['predictions'] == ['Setosa', 'Versicolor', 'Virginica']
+
+
+def test_predict_batch_json_objects(client):
+    response = client.post('/predict/batch', json={"instances": [
+        {"sepal_length": 5.1, "sepal_width": 3.5,
+         "petal_length": 1.4, "petal_width": 0.2}
+    ]})
+    assert response.status_code == 200
+    assert response.get_json()['predictions'] == ['Setosa']
+
+
+def test_predict_batch_csv(client):
+    body = "sepal_length,sepal_width,petal_length,petal_width\n5.1,3.5,1.4,0.2\n6.9,3.1,5.8,2.3\n"
+    response = client.post('/predict/batch', data=body,
+                           content_type='text/csv')
+    assert response.status_code == 200
+    assert response.get_json()['predictions'] == ['Setosa', 'Virginica']
+
+
+def test_predict_batch_rejects_bad_rows(client):
+    response = client.post('/predict/batch', json=[[5.1, 3.5, 1.4]])
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+@pytest.mark.parametrize("body, content_type", [
+    ("5.1,3.5,1.4,0.2\nnan,1,2,3\n", "text/csv"),
+    ("5.1,3.5,1.4,0.2\n1,2,-inf,3\n", "text/csv"),
+    ("[[5.1, 3.5, 1.4, 0.2], [1, Infinity, 2, 3]]", "application/json"),
+])
+def test_predict_batch_rejects_non_finite_values(client, body, content_type):
+    response = client.post('/predict/batch', data=body, content_type=content_type)
+    assert response.status_code == 400
+    assert "Row 1" in response.get_json()["error"]
+
+
+def test_predict_counts_rows_dropped_by_full_fallback_buffer(client, monkeypatch, caplog):
+    buffer = PredictionRingBuffer(1, app_module.FEATURE_NAMES,
+                                  app_module.iris_classes.values(),
+                                  overflow="drop_newest")
+    monkeypatch.setattr(app_module, "prediction_cache", buffer)
+    monkeypatch.setattr(app_module, "persist_prediction",
+                        lambda data: {"status": "degraded", "cached": True})
+    form = {"sepal_length": 5.1, "sepal_width": 3.5,
+            "petal_length": 1.4, "petal_width": 0.2}
+
+    client.post('/predict', data=form)
+    client.post('/predict', data=form)
+
+    assert len(buffer) == 1
+    assert "Fallback buffer full, prediction dropped" in caplog.text
+    body = client.get('/metrics?format=prometheus').get_data(as_text=True)
+    assert '# TYPE fallback_buffer_dropped_total counter' in body
+    assert f'fallback_buffer_dropped_total{{worker="{os.getpid()}"}} 1' in body
+
+
+def test_memo_cache_serves_repeated_features(client):
+    app_module.memo_cache.clear()
+    features = np.array([5.1, 3.5, 1.4, 0.2])
+    hits = app_module.memo_cache.hits
+    first = app_module.predict_one(features)
+    second = app_module.predict_one(features + 1e-9)
+    assert first == second
+    assert app_module.memo_cache.hits == hits + 1
+
+    data = client.get('/metrics').get_json()
+    assert data['memo_cache_size'] == 1
+    assert 'memo_cache_hits' in data and 'memo_cache_misses' in data
+
+
+def test_model_reload_clears_memo_cache(client):
+    app_module.predict_one(np.array([6.0, 2.7, 4.2, 1.3]))
+    response = client.post('/model/reload')
+    assert response.status_code == 200
+    assert len(app_module.memo_cache) == 0
+
+
+def test_model_reload_reaches_other_workers(client):
+    generation = client.post('/model/reload').get_json()['generation']
+    assert app_module.loaded_model.generation == generation
+
+    # Another worker's reload only bumps the shared generation counter.
+    with app_module.model_generation_lock:
+        app_module.model_generation.value += 1
+    client.get('/health')
+    assert app_module.loaded_model.generation == generation + 1
+    assert client.get('/metrics').get_json()['model_generation'] == generation + 1
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise ConnectionError(f"HTTP {self.status_code}")
+
+
+def test_healthy_concurrent_traffic_is_not_rejected(client, monkeypatch):
+    def slow_db(*args, **kwargs):
+        time.sleep(0.01)
+        return FakeResponse({"status": "ok"} if "data" in kwargs else [])
+
+    monkeypatch.setattr(app_module.db_client, "post", slow_db)
+    monkeypatch.setattr(app_module.db_client, "get", slow_db)
+    results = []
+
+    def caller(i):
+        results.append(app_module.save_to_database({"predicted_class": "Setosa"}))
+        results.append(app_module.get_from_database()[0])
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert results.count({"status": "ok"}) == 16
+    assert results.count([]) == 16
+
+
+def test_read_bulkhead_slot_is_free_during_retry_backoff(monkeypatch):
+    bulkhead = Bulkhead("db_read", max_concurrent=1)
+    monkeypatch.setattr(app_module, "db_read_bulkhead", bulkhead)
+    monkeypatch.setattr(app_module, "read_retry_budget", RetryBudget(ratio=1.0))
+    responses = iter([FakeResponse(None, 503), FakeResponse([])])
+    monkeypatch.setattr(app_module.db_client, "get", lambda *a, **kw: next(responses))
+    in_flight_while_sleeping = []
+    monkeypatch.setattr(time, "sleep",
+                        lambda seconds: in_flight_while_sleeping.append(bulkhead.in_flight))
+
+    assert app_module.get_from_database()[0] == []
+    assert in_flight_while_sleeping == [0]
+    assert bulkhead.stats()["accepted"] == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
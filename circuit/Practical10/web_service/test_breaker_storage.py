@@ -0,0 +1,72 @@
+import sys
+import pytest
+import pybreaker
+from breaker_storage import CircuitSQLiteStorage, make_state_storage
+from circuit_breaker import SlidingWindowCircuitBreaker
+
+
+def fail():
+    raise ConnectionError("db down")
+
+
+@pytest.fixture
+def state_path(tmp_path):
+    return str(tmp_path / "breaker.db")
+
+
+def test_pybreakers_share_failures_and_state(state_path):
+    first = pybreaker.CircuitBreaker(
+        fail_max=3, reset_timeout=60,
+        state_storage=CircuitSQLiteStorage(pybreaker.STATE_CLOSED, state_path))
+    second = pybreaker.CircuitBreaker(
+        fail_max=3, reset_timeout=60,
+        state_storage=CircuitSQLiteStorage(pybreaker.STATE_CLOSED, state_path))
+
+    for breaker in (first, second, first):
+        with pytest.raises((ConnectionError, pybreaker.CircuitBreakerError)):
+            breaker.call(fail)
+
+    assert first.current_state == "open"
+    assert second.current_state == "open"
+    with pytest.raises(pybreaker.CircuitBreakerError):
+        second.call(lambda: "ok")
+
+
+def test_storage_round_trips_opened_at(state_path):
+    storage = CircuitSQLiteStorage(pybreaker.STATE_CLOSED, state_path)
+    assert storage.opened_at is None
+    breaker = pybreaker.CircuitBreaker(state_storage=storage)
+    breaker.open()
+
+    reopened = CircuitSQLiteStorage(pybreaker.STATE_CLOSED, state_path)
+    assert reopened.state == "open"
+    assert reopened.opened_at == storage.opened_at
+
+
+def test_redis_backend_without_package_fails_clearly(monkeypatch):
+    monkeypatch.setitem(sys.modules, "redis", None)
+    with pytest.raises(ValueError, match="pip install redis"):
+        make_state_storage("redis", "db_service_breaker")
+
+
+def test_sliding_window_breakers_follow_shared_state(state_path):
+    first = SlidingWindowCircuitBreaker(
+        state_storage=CircuitSQLiteStorage(pybreaker.STATE_CLOSED, state_path))
+    second = SlidingWindowCircuitBreaker(
+        state_storage=CircuitSQLiteStorage(pybreaker.STATE_CLOSED, state_path))
+    changes = []
+
+    class Recorder(pybreaker.CircuitBreakerListener):
+        def state_change(self, cb, old_state, new_state):
+            changes.append(new_state.name)
+
+    second.add_listener(Recorder())
+    first.open()
+
+    with pytest.raises(pybreaker.CircuitBreakerError):
+        second.call(lambda: "ok")
+    assert changes == ["open"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
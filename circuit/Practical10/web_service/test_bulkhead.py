@@ -0,0 +1,58 @@
+import threading
+import pytest
+from bulkhead import Bulkhead, BulkheadFullError
+from circuit_breaker import handle_db_failure
+
+
+def test_rejects_when_full_and_frees_slots():
+    bulkhead = Bulkhead("db", max_concurrent=2)
+    with bulkhead, bulkhead:
+        with pytest.raises(BulkheadFullError):
+            with bulkhead:
+                pass
+        assert bulkhead.stats()["saturation"] == 1.0
+
+    with bulkhead:
+        pass
+    stats = bulkhead.stats()
+    assert stats["in_flight"] == 0
+    assert stats["peak"] == 2
+    assert stats["accepted"] == 3
+    assert stats["rejected"] == 1
+
+
+def test_waits_up_to_max_wait_for_a_slot():
+    bulkhead = Bulkhead("db", max_concurrent=1, max_wait=5)
+    entered = threading.Event()
+    release = threading.Event()
+
+    def holder():
+        with bulkhead:
+            entered.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    entered.wait(5)
+    threading.Timer(0.05, release.set).start()
+    with bulkhead:
+        pass
+    thread.join()
+    assert bulkhead.stats()["rejected"] == 0
+
+
+def test_handle_db_failure_degrades_when_bulkhead_full():
+    bulkhead = Bulkhead("db_write", max_concurrent=1)
+    calls = []
+
+    @handle_db_failure(bulkhead=bulkhead)
+    def save(data):
+        calls.append(data)
+        return {"status": "ok"}
+
+    assert save("a") == {"status": "ok"}
+    with bulkhead:
+        result = save("b")
+    assert result["status"] == "degraded"
+    assert result["cached"] is True
+    assert calls == ["a"]
@@ -0,0 +1,104 @@
+import pytest
+import pybreaker
+from circuit_breaker import SlidingWindowCircuitBreaker
+from testing_utils import FakeClock
+
+
+def fail():
+    raise ConnectionError("db down")
+
+
+def make_breaker(clock, **kwargs):
+    options = dict(window_size=10, minimum_calls=4, failure_rate_threshold=0.5,
+                   slow_call_rate_threshold=0.5, slow_call_duration=2.0,
+                   reset_timeout=30, half_open_max_calls=2, clock=clock)
+    options.update(kwargs)
+    return SlidingWindowCircuitBreaker(**options)
+
+
+def test_opens_on_failure_rate():
+    breaker = make_breaker(FakeClock(1000.0))
+    breaker.call(lambda: "ok")
+    breaker.call(lambda: "ok")
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.current_state == "closed"
+
+    with pytest.raises(pybreaker.CircuitBreakerError):
+        breaker.call(fail)
+    assert breaker.current_state == "open"
+
+    with pytest.raises(pybreaker.CircuitBreakerError):
+        breaker.call(lambda: "ok")
+
+
+def test_opens_on_slow_calls_that_succeed():
+    clock = FakeClock(1000.0)
+    breaker = make_breaker(clock)
+
+    def slow_call():
+        clock.now += 4.9
+        return "ok"
+
+    for _ in range(4):
+        assert breaker.call(slow_call) == "ok"
+    assert breaker.current_state == "open"
+
+
+def test_excluded_exceptions_do_not_count():
+    breaker = make_breaker(FakeClock(1000.0), exclude=[ValueError])
+
+    def bad_input():
+        raise ValueError("bad input")
+
+    for _ in range(6):
+        with pytest.raises(ValueError):
+            breaker.call(bad_input)
+    assert breaker.current_state == "closed"
+
+
+def test_half_open_limits_trial_calls_and_closes():
+    clock = FakeClock(1000.0)
+    breaker = make_breaker(clock)
+    breaker.open()
+    clock.now += 31
+
+    def trial():
+        # Only two trial calls are allowed while the first is still running.
+        with pytest.raises(pybreaker.CircuitBreakerError):
+            breaker.call(lambda: "third")
+        return "ok"
+
+    breaker.call(lambda: "first")
+    assert breaker.current_state == "half-open"
+    breaker.call(trial)
+    assert breaker.current_state == "closed"
+
+
+def test_failed_trial_reopens():
+    clock = FakeClock(1000.0)
+    breaker = make_breaker(clock)
+    breaker.open()
+    clock.now += 31
+
+    with pytest.raises(pybreaker.CircuitBreakerError):
+        breaker.call(fail)
+    assert breaker.current_state == "open"
+
+
+def test_time_window_forgets_old_failures():
+    clock = FakeClock(1000.0)
+    breaker = make_breaker(clock, window_type="time", window_size=10)
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    clock.now += 11
+
+    for _ in range(4):
+        breaker.call(lambda: "ok")
+    assert breaker.current_state == "closed"
+    assert breaker.window_stats()["failure_rate"] == 0.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
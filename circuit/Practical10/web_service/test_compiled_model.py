@@ -0,0 +1,39 @@
+import pickle
+import numpy as np
+import pytest
+from compiled_model import CompiledModel, compile_model, main
+
+
+@pytest.fixture
+def estimator():
+    with open('model.pkl', 'rb') as f:
+        return pickle.load(f)
+
+
+def test_compiled_predictions_match_sklearn(estimator):
+    compiled = CompiledModel(compile_model(estimator))
+    X = np.random.default_rng(42).uniform(0.0, 8.0, size=(5000, 4))
+    assert np.array_equal(compiled.predict(X), estimator.predict(X))
+    assert compiled.predict(np.array([5.1, 3.5, 1.4, 0.2]))[0] == 0
+
+
+def test_compile_roundtrip_through_npz(estimator, tmp_path):
+    output = str(tmp_path / 'model.npz')
+    assert main(['compiled_model.py', 'model.pkl', output]) == 0
+
+    compiled = CompiledModel.load(output)
+    X = np.array([[5.1, 3.5, 1.4, 0.2], [6.9, 3.1, 5.8, 2.3]])
+    assert np.array_equal(compiled.predict(X), estimator.predict(X))
+    assert np.array_equal(compiled.classes_, estimator.classes_)
+
+
+def test_unsupported_estimator_is_rejected():
+    class Opaque:
+        classes_ = np.array([0, 1])
+
+    with pytest.raises(ValueError):
+        compile_model(Opaque())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
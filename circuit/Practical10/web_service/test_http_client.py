@@ -0,0 +1,64 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from http_client import PooledHTTPClient
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_connections_are_reused(server_url):
+    client = PooledHTTPClient(pool_size=2)
+    for _ in range(5):
+        assert client.get(server_url).json() == {"ok": True}
+
+    stats = client.stats()
+    assert stats["requests"] == 5
+    assert stats["connections_created"] == 1
+    assert stats["connections_reused"] == 4
+
+
+def test_threads_share_one_pool(server_url):
+    client = PooledHTTPClient(pool_size=4)
+    threads = [threading.Thread(target=client.get, args=(server_url,))
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = client.stats()
+    assert stats["requests"] == 4
+    assert stats["connections_created"] <= 4
+
+
+def test_default_timeouts_are_split():
+    client = PooledHTTPClient(connect_timeout=0.5, read_timeout=3)
+    assert client.timeout == (0.5, 3)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,43 @@
+from lru_cache import LRUCache
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_entries_expire_after_ttl():
+    now = [0.0]
+    cache = LRUCache(maxsize=4, ttl=10, clock=lambda: now[0])
+    cache.put("a", 1)
+    now[0] = 9.9
+    assert cache.get("a") == 1
+    now[0] = 10.1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_counts_hits_and_misses():
+    cache = LRUCache(maxsize=4)
+    cache.get("a")
+    cache.put("a", 1)
+    cache.get("a")
+    cache.clear()
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 0
+
+
+if __name__ == "__main__":
+    import pytest
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,74 @@
+import pytest
+from metrics import Histogram, HistogramFamily, CounterFamily, Gauge, MetricsRegistry
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", (0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {"0.1": 2, "1.0": 3, "+Inf": 4}
+    assert snapshot["count"] == 4
+    assert snapshot["sum"] == pytest.approx(2.65)
+
+
+def test_prometheus_exposition_format():
+    registry = MetricsRegistry()
+    stages = registry.register(HistogramFamily(
+        "stage_seconds", (0.5,), ["stage"], "Stage latency"))
+    requests = registry.register(CounterFamily(
+        "requests_total", ["route", "status"], "Requests"))
+    registry.register(Gauge("queue_depth", lambda: 3))
+
+    stages.labels("parse").observe(0.25)
+    requests.inc("/predict", 200)
+    requests.inc("/predict", 200)
+
+    assert registry.render_prometheus().splitlines() == [
+        "# HELP stage_seconds Stage latency",
+        "# TYPE stage_seconds histogram",
+        'stage_seconds_bucket{stage="parse",le="0.5"} 1',
+        'stage_seconds_bucket{stage="parse",le="+Inf"} 1',
+        'stage_seconds_sum{stage="parse"} 0.25',
+        'stage_seconds_count{stage="parse"} 1',
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{route="/predict",status="200"} 2',
+        "# TYPE queue_depth gauge",
+        "queue_depth 3",
+    ]
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    counter = registry.register(CounterFamily("c", ["path"]))
+    counter.inc('a"b\\c')
+    assert 'c{path="a\\"b\\\\c"} 1' in registry.render_prometheus()
+
+
+def test_const_labels_are_added_to_every_sample():
+    registry = MetricsRegistry(const_labels=lambda: {"worker": "41"})
+    counter = registry.register(CounterFamily("requests_total", ["route"]))
+    registry.register(Gauge("queue_depth", lambda: 0))
+    counter.inc("/predict")
+
+    samples = [line for line in registry.render_prometheus().splitlines()
+               if not line.startswith("#")]
+    assert samples == [
+        'requests_total{worker="41",route="/predict"} 1',
+        'queue_depth{worker="41"} 0',
+    ]
+
+
+def test_gauge_can_expose_a_counter():
+    registry = MetricsRegistry()
+    registry.register(Gauge("dropped_total", lambda: 7, kind="counter"))
+    assert registry.render_prometheus().splitlines() == [
+        "# TYPE dropped_total counter",
+        "dropped_total 7",
+    ]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
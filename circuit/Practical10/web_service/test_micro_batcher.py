@@ -0,0 +1,67 @@
+import threading
+import numpy as np
+from micro_batcher import MicroBatcher
+
+
+def test_concurrent_requests_share_one_batch():
+    calls = []
+
+    def predict_fn(features):
+        calls.append(features.shape[0])
+        return features[:, 0] * 10
+
+    batcher = MicroBatcher(predict_fn, max_batch_size=8, max_wait=0.2)
+    results = {}
+
+    def worker(i):
+        results[i] = batcher.predict(np.array([i, 0.0, 0.0, 0.0]), timeout=5)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {i: i * 10 for i in range(8)}
+    assert sum(calls) == 8
+    assert len(calls) < 8
+    assert batcher.stats()["batch_size"]["count"] == len(calls)
+
+
+def test_errors_are_returned_to_every_caller():
+    def predict_fn(features):
+        raise RuntimeError("model failure")
+
+    batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait=0.001)
+    try:
+        batcher.predict(np.zeros(4), timeout=5)
+        assert False, "expected RuntimeError"
+    except RuntimeError as e:
+        assert "model failure" in str(e)
+
+
+def test_short_model_output_fails_every_caller():
+    def predict_fn(features):
+        return features[:0, 0]
+
+    batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait=0.2)
+    errors = []
+
+    def worker(i):
+        try:
+            batcher.predict(np.array([i, 0.0, 0.0, 0.0]), timeout=5)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(errors) == 4
+
+
+if __name__ == "__main__":
+    import pytest
+    pytest.main([__file__, "-v"])
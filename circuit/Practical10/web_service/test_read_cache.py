@@ -0,0 +1,79 @@
+import pytest
+from read_cache import StaleWhileRevalidateCache, NOT_MODIFIED
+from testing_utils import FakeClock, wait_for
+
+
+class FakeOrigin:
+    def __init__(self):
+        self.version = 1
+        self.calls = []
+        self.fail = False
+
+    def __call__(self, etag):
+        self.calls.append(etag)
+        if self.fail:
+            raise ConnectionError("db down")
+        if etag == str(self.version):
+            return NOT_MODIFIED, etag
+        return [self.version], str(self.version)
+
+
+def test_fresh_values_are_served_from_cache():
+    clock, origin = FakeClock(), FakeOrigin()
+    cache = StaleWhileRevalidateCache(origin, max_age=5, clock=clock)
+    assert cache.get() == [1]
+    clock.now = 4
+    assert cache.get() == [1]
+    assert origin.calls == [None]
+
+
+def test_stale_value_is_served_while_revalidating():
+    clock, origin = FakeClock(), FakeOrigin()
+    cache = StaleWhileRevalidateCache(origin, max_age=5, clock=clock)
+    cache.get()
+    origin.version = 2
+    clock.now = 6
+
+    assert cache.get() == [1]
+    assert wait_for(lambda: cache.stats()["etag"] == "2")
+    assert cache.get() == [2]
+    assert origin.calls == [None, "1"]
+
+
+def test_unchanged_data_is_revalidated_with_etag():
+    clock, origin = FakeClock(), FakeOrigin()
+    cache = StaleWhileRevalidateCache(origin, max_age=5, clock=clock)
+    cache.get()
+    cache.invalidate()
+
+    assert cache.get() == [1]
+    assert origin.calls == [None, "1"]
+    assert cache.stats()["not_modified"] == 1
+
+
+def test_invalidate_forces_synchronous_refresh():
+    clock, origin = FakeClock(), FakeOrigin()
+    cache = StaleWhileRevalidateCache(origin, max_age=5, clock=clock)
+    cache.get()
+    origin.version = 2
+    cache.invalidate()
+    assert cache.get() == [2]
+
+
+def test_failed_refresh_falls_back_to_cached_copy():
+    clock, origin = FakeClock(), FakeOrigin()
+    cache = StaleWhileRevalidateCache(origin, max_age=5, clock=clock)
+    with pytest.raises(ConnectionError):
+        origin.fail = True
+        cache.get()
+
+    origin.fail = False
+    cache.get()
+    origin.fail = True
+    cache.invalidate()
+    assert cache.get() == [1]
+    assert cache.stats()["refresh_errors"] == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,93 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from tenacity import Retrying, stop_after_attempt, wait_fixed
+from retry_policy import (Deadline, RetryBudget, LatencyTracker, hedged_call,
+                          stop_before_deadline, stop_when_budget_exhausted)
+from testing_utils import FakeClock
+
+
+def test_budget_limits_retries_to_ratio_of_requests():
+    clock = FakeClock()
+    budget = RetryBudget(ratio=0.1, min_per_second=0, clock=clock)
+    for _ in range(30):
+        budget.record_request()
+
+    granted = sum(budget.try_withdraw() for _ in range(10))
+    assert granted == 3
+    assert budget.stats()["rejected"] == 7
+
+
+def test_budget_trickles_in_over_time():
+    clock = FakeClock()
+    budget = RetryBudget(ratio=0, min_per_second=0.5, clock=clock)
+    assert not budget.try_withdraw()
+    clock.now += 2
+    assert budget.try_withdraw()
+
+
+def test_retries_stop_at_deadline():
+    clock = FakeClock()
+    deadline = Deadline(5, clock=clock)
+    attempts = []
+
+    def sleep(seconds):
+        clock.now += seconds
+
+    retrying = Retrying(stop=stop_after_attempt(10) | stop_before_deadline(deadline),
+                        wait=wait_fixed(2), sleep=sleep, reraise=True)
+    with pytest.raises(ConnectionError):
+        for attempt in retrying:
+            with attempt:
+                attempts.append(clock.now)
+                raise ConnectionError("db down")
+
+    assert attempts == [0.0, 2.0, 4.0]
+
+
+def test_retries_stop_when_budget_is_empty():
+    budget = RetryBudget(ratio=0, min_per_second=0, max_tokens=1)
+    budget._tokens = 1
+    attempts = []
+
+    retrying = Retrying(stop=stop_after_attempt(5) | stop_when_budget_exhausted(budget),
+                        sleep=lambda s: None, reraise=True)
+    with pytest.raises(ConnectionError):
+        for attempt in retrying:
+            with attempt:
+                attempts.append(1)
+                raise ConnectionError("db down")
+
+    assert len(attempts) == 2
+
+
+def test_latency_tracker_percentile():
+    tracker = LatencyTracker(min_samples=10, default=1.0)
+    assert tracker.percentile(0.95) == 1.0
+    for ms in range(1, 101):
+        tracker.observe(ms / 1000)
+    assert tracker.percentile(0.95) == pytest.approx(0.096)
+
+
+def test_hedged_request_wins_over_slow_primary():
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(1)
+            return "slow"
+        return "fast"
+
+    budget = RetryBudget(ratio=1, min_per_second=0)
+    budget.record_request()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        result = hedged_call(fetch, executor, 0.05, budget, Deadline(5))
+
+    assert result == "fast"
+    assert budget.stats()["retries"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,70 @@
+import pybreaker
+import pytest
+from ring_buffer import PredictionRingBuffer, BufferReplayer
+from testing_utils import wait_for
+
+FIELDS = ['sepal_length', 'sepal_width', 'petal_length', 'petal_width']
+CLASSES = ['Setosa', 'Versicolor', 'Virginica']
+
+
+def record(value, predicted_class='Setosa'):
+    return {"sepal_length": value, "sepal_width": 3.5, "petal_length": 1.4,
+            "petal_width": 0.2, "predicted_class": predicted_class}
+
+
+def test_drop_oldest_keeps_most_recent_records():
+    buffer = PredictionRingBuffer(3, FIELDS, CLASSES)
+    for i in range(5):
+        assert buffer.append(record(float(i)))
+
+    assert len(buffer) == 3
+    assert [r["sepal_length"] for r in buffer.snapshot()] == [2.0, 3.0, 4.0]
+    assert buffer.stats()["dropped"] == 2
+
+
+def test_drop_newest_rejects_when_full():
+    buffer = PredictionRingBuffer(2, FIELDS, CLASSES, overflow="drop_newest")
+    assert buffer.append(record(1.0))
+    assert buffer.append(record(2.0, 'Virginica'))
+    assert not buffer.append(record(3.0))
+
+    assert buffer.snapshot() == [record(1.0), record(2.0, 'Virginica')]
+
+
+def test_unknown_overflow_policy_is_rejected():
+    with pytest.raises(ValueError):
+        PredictionRingBuffer(2, FIELDS, CLASSES, overflow="block")
+
+
+def test_discard_only_acknowledges_peeked_rows():
+    buffer = PredictionRingBuffer(4, FIELDS, CLASSES)
+    buffer.append(record(1.0))
+    buffer.append(record(2.0))
+    until, batch = buffer.peek(10)
+    buffer.append(record(3.0))
+    buffer.discard(until)
+
+    assert len(batch) == 2
+    assert [r["sepal_length"] for r in buffer.snapshot()] == [3.0]
+
+
+def test_buffer_is_replayed_when_breaker_closes():
+    breaker = pybreaker.CircuitBreaker(fail_max=1, reset_timeout=0)
+    buffer = PredictionRingBuffer(10, FIELDS, CLASSES)
+    sent = []
+    replayer = BufferReplayer(buffer, sent.extend, breaker, batch_size=2)
+    breaker.add_listener(replayer)
+
+    breaker.open()
+    for i in range(5):
+        buffer.append(record(float(i)))
+    breaker.call(lambda: "ok")
+
+    assert wait_for(lambda: not len(buffer))
+    assert breaker.current_state == "closed"
+    assert [r["sepal_length"] for r in sent] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert replayer.replayed == 5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,39 @@
+import os
+from worker_stats import WorkerStats
+
+
+def test_requests_are_counted_per_worker():
+    stats = WorkerStats(max_workers=4)
+    for _ in range(3):
+        stats.record_request()
+
+    workers = stats.snapshot()
+    assert len(workers) == 1
+    assert workers[0]["pid"] == os.getpid()
+    assert workers[0]["requests"] == 3
+
+
+def test_forked_worker_claims_its_own_slot():
+    stats = WorkerStats(max_workers=4)
+    stats.record_request()
+
+    pid = os.fork()
+    if pid == 0:
+        stats.register_worker(boot_seconds=0.5)
+        stats.record_request()
+        stats.record_request()
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+    by_pid = {w["pid"]: w for w in stats.snapshot()}
+    assert by_pid[os.getpid()]["requests"] == 1
+    assert by_pid[pid]["requests"] == 2
+    assert by_pid[pid]["boot_seconds"] == 0.5
+
+    stats.release_worker(pid)
+    assert [w["pid"] for w in stats.snapshot()] == [os.getpid()]
+
+
+if __name__ == "__main__":
+    import pytest
+    pytest.main([__file__, "-v"])
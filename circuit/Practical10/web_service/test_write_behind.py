@@ -0,0 +1,70 @@
+import pybreaker
+from write_behind import WriteBehindQueue
+from testing_utils import wait_for
+
+
+def test_records_are_flushed_in_batches():
+    batches = []
+    queue = WriteBehindQueue(batches.append, batch_size=3, flush_interval=0.05)
+    for i in range(7):
+        assert queue.submit({"id": i})
+
+    assert wait_for(lambda: queue.flushed == 7)
+    assert [r["id"] for batch in batches for r in batch] == list(range(7))
+    assert max(len(batch) for batch in batches) <= 3
+    assert queue.stats()["queue_depth"] == 0
+
+
+def test_full_queue_drops_new_records():
+    queue = WriteBehindQueue(lambda batch: None, max_queue=2,
+                             batch_size=100, flush_interval=60)
+    assert queue.submit({"id": 1})
+    assert queue.submit({"id": 2})
+    assert not queue.submit({"id": 3})
+    assert queue.stats()["dropped"] == 1
+
+
+def test_failed_flush_requeues_batch_and_respects_breaker():
+    breaker = pybreaker.CircuitBreaker(fail_max=1, reset_timeout=60)
+
+    def failing_flush(batch):
+        raise ConnectionError("db down")
+
+    queue = WriteBehindQueue(failing_flush, batch_size=10,
+                             flush_interval=60, breaker=breaker)
+    queue.submit({"id": 1})
+    queue.submit({"id": 2})
+
+    assert queue.flush_once() == 0
+    assert breaker.current_state == "open"
+    assert queue.stats()["queue_depth"] == 2
+
+    assert queue.flush_once() == 0
+    assert queue.failed_flushes == 2
+    assert queue.stats()["queue_depth"] == 2
+
+
+def test_queue_drains_after_breaker_recovers():
+    breaker = pybreaker.CircuitBreaker(fail_max=1, reset_timeout=0.2)
+    db_up = False
+    flushed = []
+
+    def flush(batch):
+        if not db_up:
+            raise ConnectionError("db down")
+        flushed.extend(batch)
+
+    queue = WriteBehindQueue(flush, batch_size=1, flush_interval=0.05, breaker=breaker)
+    queue.submit({"id": 1})
+    assert wait_for(lambda: breaker.current_state == "open")
+
+    db_up = True
+    queue.submit({"id": 2})
+    assert wait_for(lambda: queue.flushed == 2)
+    assert [r["id"] for r in flushed] == [1, 2]
+    assert breaker.current_state == "closed"
+
+
+if __name__ == "__main__":
+    import pytest
+    pytest.main([__file__, "-v"])
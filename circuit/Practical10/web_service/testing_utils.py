@@ -0,0 +1,22 @@
+"""Helpers shared by the web_service tests."""
+import time
+
+
+class FakeClock:
+    """Clock for code that takes a ``clock`` callable; move it by setting
+    or adding to ``now``."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def wait_for(condition, timeout=5):
+    """Poll ``condition`` until it is true or ``timeout`` seconds pass, and
+    return its last value."""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
@@ -0,0 +1,61 @@
+import os
+import time
+import ctypes
+import threading
+import multiprocessing
+
+
+class WorkerStats:
+    """Per-worker request counters kept in shared memory.
+
+    The arrays are allocated before the server forks, so every worker
+    process writes to its own slot and any worker can report on all of
+    them. Outside a pre-fork server the current process claims a slot on
+    first use.
+    """
+
+    def __init__(self, max_workers=32):
+        self.max_workers = max_workers
+        self._pids = multiprocessing.RawArray(ctypes.c_long, max_workers)
+        self._requests = multiprocessing.RawArray(ctypes.c_ulonglong, max_workers)
+        self._started_at = multiprocessing.RawArray(ctypes.c_double, max_workers)
+        self._boot_seconds = multiprocessing.RawArray(ctypes.c_double, max_workers)
+        self._slots_lock = multiprocessing.Lock()
+        self._local_lock = threading.Lock()
+        self._slot = None
+        self._slot_pid = None
+
+    def register_worker(self, boot_seconds=0.0):
+        pid = os.getpid()
+        with self._slots_lock:
+            for slot in range(self.max_workers):
+                if self._pids[slot] in (0, pid):
+                    self._pids[slot] = pid
+                    self._requests[slot] = 0
+                    self._started_at[slot] = time.time()
+                    self._boot_seconds[slot] = boot_seconds
+                    self._slot, self._slot_pid = slot, pid
+                    return slot
+        return None
+
+    def release_worker(self, pid):
+        with self._slots_lock:
+            for slot in range(self.max_workers):
+                if self._pids[slot] == pid:
+                    self._pids[slot] = 0
+
+    def record_request(self):
+        if self._slot_pid != os.getpid():
+            self.register_worker()
+        if self._slot is None:
+            return
+        with self._local_lock:
+            self._requests[self._slot] += 1
+
+    def snapshot(self):
+        return [{
+            "pid": self._pids[slot],
+            "requests": self._requests[slot],
+            "started_at": self._started_at[slot],
+            "boot_seconds": self._boot_seconds[slot]
+        } for slot in range(self.max_workers) if self._pids[slot]]
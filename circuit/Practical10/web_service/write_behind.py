@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+import logging
+from collections import deque
+
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+FLUSH_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1,
+                         0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class WriteBehindQueue:
+    """Bounded in-memory queue that persists records in the background.
+
+    ``submit`` never blocks on the database: records are appended to the
+    queue and a worker thread hands them to ``flush_fn`` in batches. A
+    failed flush (including an open ``breaker``) puts the batch back at the
+    head of the queue, so delivery is at-least-once.
+    """
+
+    def __init__(self, flush_fn, max_queue=10000, batch_size=50,
+                 flush_interval=1.0, breaker=None):
+        self.flush_fn = flush_fn
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.breaker = breaker
+        self.flushed = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+        self.flush_latency_histogram = Histogram(
+            "write_behind_flush_seconds", FLUSH_LATENCY_BUCKETS,
+            "Time taken to flush one batch to the db_service")
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+
+    def submit(self, record):
+        self._ensure_started()
+        with self._cond:
+            if len(self._items) >= self.max_queue:
+                self.dropped += 1
+                return False
+            self._items.append(record)
+            if len(self._items) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def flush_once(self):
+        with self._cond:
+            batch = [self._items.popleft()
+                     for _ in range(min(self.batch_size, len(self._items)))]
+        if not batch:
+            return 0
+
+        start = time.perf_counter()
+        try:
+            if self.breaker is not None:
+                self.breaker.call(self.flush_fn, batch)
+            else:
+                self.flush_fn(batch)
+        except Exception as e:
+            self.failed_flushes += 1
+            self._requeue(batch)
+            logger.warning(
+                f"Write-behind flush of {len(batch)} records failed: {str(e)}")
+            return 0
+        finally:
+            self.flush_latency_histogram.observe(time.perf_counter() - start)
+
+        self.flushed += len(batch)
+        return len(batch)
+
+    def close(self, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while len(self._items) and time.monotonic() < deadline:
+            if not self.flush_once():
+                break
+
+    def stats(self):
+        return {
+            "enabled": True,
+            "queue_depth": len(self._items),
+            "max_queue": self.max_queue,
+            "batch_size": self.batch_size,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "failed_flushes": self.failed_flushes,
+            "flush_latency_seconds": self.flush_latency_histogram.snapshot()
+        }
+
+    def _requeue(self, batch):
+        with self._cond:
+            self._items.extendleft(reversed(batch))
+            while len(self._items) > self.max_queue:
+                self._items.pop()
+                self.dropped += 1
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so a worker process has to start its own.
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._items) >= self.batch_size,
+                                    timeout=self.flush_interval)
+            # An open breaker rejects the flush without calling flush_fn, and
+            # once its reset_timeout has passed this same call is the trial
+            # that moves it to half-open, so retries are paced by the breaker.
+            if self._items and not self.flush_once():
+                time.sleep(self.flush_interval)
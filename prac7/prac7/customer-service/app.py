@@ -84,9 +84,14 @@ def health():
 def get_products():
     """Get all products via Kong Gateway (synchronous)"""
     try:
-        response = requests.get(f'{KONG_GATEWAY_URL}/product-service/products')
+        # Pass the client's ETag through so an unchanged catalog comes back as a 304
+        headers = {'If-None-Match': request.headers['If-None-Match']} if 'If-None-Match' in request.headers else {}
+        response = requests.get(f'{KONG_GATEWAY_URL}/product-service/products', headers=headers)
+        etag = {'ETag': response.headers['ETag']} if 'ETag' in response.headers else {}
+        if response.status_code == 304:
+            return '', 304, etag
         response.raise_for_status()
-        return jsonify(response.json()), response.status_code
+        return jsonify(response.json()), response.status_code, etag
     except requests.exceptions.RequestException as e:
         return jsonify({'error': f'Failed to fetch products: {str(e)}'}), 500
 
@@ -107,14 +112,18 @@ def create_order():
     """
     data = request.get_json()
     
-    if not all(k in data for k in ('customer_id', 'product_id', 'quantity')):
-        return jsonify({'error': 'Missing required fields: customer_id, product_id, quantity'}), 400
+    if 'customer_id' not in data or not ('items' in data or all(k in data for k in ('product_id', 'quantity'))):
+        return jsonify({'error': 'Missing required fields: customer_id, and items or product_id and quantity'}), 400
     
     try:
         # Synchronous: Create order via Kong Gateway to Order Service
+        # Pass the client's Idempotency-Key through, so a retried checkout
+        # gets the original order back instead of reserving stock again
+        idempotency_key = request.headers.get('Idempotency-Key')
         response = requests.post(
             f'{KONG_GATEWAY_URL}/order-service/orders',
-            json=data
+            json=data,
+            headers={'Idempotency-Key': idempotency_key} if idempotency_key else None
         )
         
         if response.status_code == 201:
@@ -127,7 +136,8 @@ def create_order():
                     'order_id': order_data['id'],
                     'customer_id': data['customer_id'],
                     'product_name': order_data.get('product_name', 'Unknown'),
-                    'quantity': data['quantity'],
+                    'quantity': order_data.get('quantity', 0),
+                    'items': order_data.get('items', []),
                     'total_price': order_data.get('total_price', 0),
                     'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
                 }
@@ -1,22 +1,56 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import sqlite3
 import requests
+from requests.adapters import HTTPAdapter
 import os
+import sys
+import uuid
+import threading
+import logging
+import sqlite3
 from datetime import datetime
 
+# The shared package sits next to app.py in the image and one level up in the repo
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared.db import Database
+
 app = Flask(__name__)
 CORS(app)
+logger = logging.getLogger(__name__)
 
 DB_PATH = 'orders.db'
+db = Database(DB_PATH)
 PRODUCT_SERVICE_URL = os.environ.get('PRODUCT_SERVICE_URL', 'http://product-service:5001')
+PRODUCT_SERVICE_TIMEOUT = (
+    float(os.environ.get('PRODUCT_SERVICE_CONNECT_TIMEOUT', 1.0)),
+    float(os.environ.get('PRODUCT_SERVICE_READ_TIMEOUT', 3.0))
+)
+
+# requests.Session is not thread-safe, so each request thread gets its own,
+# all mounted on one adapter so they share a single keep-alive pool
+product_adapter = HTTPAdapter(
+    pool_connections=1, pool_maxsize=int(os.environ.get('PRODUCT_SERVICE_POOL_SIZE', 10)))
+_product_sessions = threading.local()
+
+def product_session():
+    """This thread's session for calls to Product Service"""
+    session = getattr(_product_sessions, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.mount('http://', product_adapter)
+        session.mount('https://', product_adapter)
+        _product_sessions.session = session
+    return session
+
+ORDER_COLUMNS = 'id, customer_id, product_id, product_name, quantity, total_price, status, created_at'
+LINE_COLUMNS = 'product_id, product_name, quantity, unit_price, line_total'
 
 def init_db():
     """Initialize the orders database"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
+    # An order is a header row plus one order_lines row per product. The
+    # header keeps its single-product columns, holding the first line's
+    # product and the order's total quantity, so existing readers still work.
+    db.executescript('''
         CREATE TABLE IF NOT EXISTS orders (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             customer_id INTEGER NOT NULL,
@@ -26,104 +60,189 @@ def init_db():
             total_price REAL NOT NULL,
             status TEXT NOT NULL,
             created_at TEXT NOT NULL
-        )
+        );
+        
+        CREATE TABLE IF NOT EXISTS order_lines (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL REFERENCES orders (id),
+            product_id INTEGER NOT NULL,
+            product_name TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_price REAL NOT NULL,
+            line_total REAL NOT NULL
+        );
+        
+        CREATE INDEX IF NOT EXISTS idx_order_lines_order_id ON order_lines (order_id);
+        
+        -- The Product Service reservation behind each order; a retried
+        -- request with the same Idempotency-Key finds its order here
+        CREATE TABLE IF NOT EXISTS order_reservations (
+            reservation_id TEXT PRIMARY KEY,
+            order_id INTEGER NOT NULL UNIQUE REFERENCES orders (id)
+        );
+        
+        -- Give orders created before order_lines existed their single line.
+        -- unit_price is NOT NULL, and total_price / 0 is NULL in SQLite.
+        INSERT INTO order_lines (order_id, product_id, product_name, quantity, unit_price, line_total)
+        SELECT id, product_id, product_name, quantity,
+               CASE WHEN quantity > 0 THEN total_price / quantity ELSE total_price END,
+               total_price
+        FROM orders WHERE id NOT IN (SELECT order_id FROM order_lines);
     ''')
-    
-    conn.commit()
-    conn.close()
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
     return jsonify({'status': 'healthy', 'service': 'order-service'}), 200
 
+def order_items(data):
+    """Read the requested lines as [{product_id, quantity}], or None if malformed.
+    
+    Accepts a cart ({"items": [...]}) or the single-product form
+    ({"product_id": ..., "quantity": ...}).
+    """
+    if 'items' not in data:
+        if 'product_id' not in data or 'quantity' not in data:
+            return None
+        return [{'product_id': data['product_id'], 'quantity': data['quantity']}]
+    
+    items = data['items']
+    if not isinstance(items, list) or not items:
+        return None
+    if not all(isinstance(item, dict) and 'product_id' in item and 'quantity' in item for item in items):
+        return None
+    return [{'product_id': item['product_id'], 'quantity': item['quantity']} for item in items]
+
+def release_reservation(reservation_id):
+    """Ask Product Service to put a reservation's stock back; failures are logged, not raised"""
+    try:
+        product_session().post(
+            f'{PRODUCT_SERVICE_URL}/products/reservations/{reservation_id}/release',
+            timeout=PRODUCT_SERVICE_TIMEOUT
+        ).raise_for_status()
+        return True
+    except requests.exceptions.RequestException as e:
+        logger.error(f'Could not release reservation {reservation_id}: {str(e)}')
+        return False
+
+def order_for_reservation(reservation_id):
+    """The order already created for a reservation, or None"""
+    row = db.query_one('SELECT order_id FROM order_reservations WHERE reservation_id = ?',
+                       (reservation_id,))
+    if row is None:
+        return None
+    order = db.query_one(f'SELECT {ORDER_COLUMNS} FROM orders WHERE id = ?', (row['order_id'],))
+    order['items'] = db.query(
+        f'SELECT {LINE_COLUMNS} FROM order_lines WHERE order_id = ? ORDER BY id', (order['id'],))
+    return order
+
 @app.route('/orders', methods=['POST'])
 def create_order():
-    """Create a new order (synchronous communication with Product Service)"""
+    """Create a new order (synchronous communication with Product Service).
+    
+    Every order reserves stock under a reservation id, which is the client's
+    Idempotency-Key header when one is sent. A retry with the same key gets
+    the order created the first time instead of reserving again. If the
+    order cannot be saved, or Product Service did not answer, the
+    reservation is released so its stock is not lost.
+    """
     data = request.get_json()
+    items = order_items(data)
     
-    if not all(k in data for k in ('customer_id', 'product_id', 'quantity')):
+    if 'customer_id' not in data or items is None:
         return jsonify({'error': 'Missing required fields'}), 400
     
-    # Synchronous call to Product Service to check availability and get product details
+    idempotency_key = request.headers.get('Idempotency-Key')
+    if idempotency_key:
+        existing = order_for_reservation(idempotency_key)
+        if existing:
+            return jsonify(existing), 200
+    reservation_id = idempotency_key or uuid.uuid4().hex
+    
+    # One synchronous call to Product Service reserves every line, all or nothing,
+    # and returns each product's name and price
     try:
-        product_response = requests.get(f'{PRODUCT_SERVICE_URL}/products/{data["product_id"]}')
-        
-        if product_response.status_code == 404:
-            return jsonify({'error': 'Product not found'}), 404
-        
-        product_response.raise_for_status()
-        product = product_response.json()
-        
-        if product['stock'] < data['quantity']:
-            return jsonify({
-                'error': 'Insufficient stock',
-                'available': product['stock'],
-                'requested': data['quantity']
-            }), 400
-        
-        # Update stock in Product Service (synchronous)
-        stock_response = requests.put(
-            f'{PRODUCT_SERVICE_URL}/products/{data["product_id"]}/stock',
-            json={'quantity': data['quantity']}
+        reserve_response = product_session().post(
+            f'{PRODUCT_SERVICE_URL}/products/reserve',
+            json={'items': items, 'reservation_id': reservation_id},
+            timeout=PRODUCT_SERVICE_TIMEOUT
         )
-        stock_response.raise_for_status()
         
-        # Calculate total price
-        total_price = product['price'] * data['quantity']
-        
-        # Create order in database
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
-            '''INSERT INTO orders (customer_id, product_id, product_name, quantity, total_price, status, created_at)
-               VALUES (?, ?, ?, ?, ?, ?, ?)''',
-            (data['customer_id'], data['product_id'], product['name'], 
-             data['quantity'], total_price, 'PENDING', datetime.now().isoformat())
-        )
-        order_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        # Unknown product, insufficient stock or a bad quantity; Product Service explains which.
+        # 409 means this reservation id was already released.
+        if reserve_response.status_code in (400, 404, 409):
+            return jsonify(reserve_response.json()), reserve_response.status_code
         
-        order_data = {
-            'id': order_id,
-            'customer_id': data['customer_id'],
-            'product_id': data['product_id'],
-            'product_name': product['name'],
-            'quantity': data['quantity'],
-            'total_price': total_price,
-            'status': 'PENDING',
-            'message': 'Order created successfully'
-        }
-        
-        return jsonify(order_data), 201
+        reserve_response.raise_for_status()
+        reserved = reserve_response.json()['items']
         
     except requests.exceptions.RequestException as e:
+        # A timeout does not mean nothing was reserved; Product Service may have
+        # committed after we stopped waiting
+        release_reservation(reservation_id)
         return jsonify({'error': f'Failed to communicate with Product Service: {str(e)}'}), 500
+    
+    lines = [{
+        'product_id': item['product_id'],
+        'product_name': item['name'],
+        'quantity': item['quantity'],
+        'unit_price': item['price'],
+        'line_total': item['price'] * item['quantity']
+    } for item in reserved]
+    total_price = sum(line['line_total'] for line in lines)
+    total_quantity = sum(line['quantity'] for line in lines)
+    
+    # Create the order header, all its lines and its reservation link in one transaction
+    try:
+        with db.transaction() as conn:
+            cursor = conn.execute(
+                '''INSERT INTO orders (customer_id, product_id, product_name, quantity, total_price, status, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                (data['customer_id'], lines[0]['product_id'], lines[0]['product_name'],
+                 total_quantity, total_price, 'PENDING', datetime.now().isoformat())
+            )
+            order_id = cursor.lastrowid
+            conn.executemany(
+                '''INSERT INTO order_lines (order_id, product_id, product_name, quantity, unit_price, line_total)
+                   VALUES (?, ?, ?, ?, ?, ?)''',
+                [(order_id, line['product_id'], line['product_name'], line['quantity'],
+                  line['unit_price'], line['line_total']) for line in lines]
+            )
+            conn.execute('INSERT INTO order_reservations (reservation_id, order_id) VALUES (?, ?)',
+                         (reservation_id, order_id))
+    except Exception as e:
+        if isinstance(e, sqlite3.IntegrityError):
+            # A concurrent retry with the same key saved the order first; the
+            # reservation is shared, so it must not be released
+            existing = order_for_reservation(reservation_id)
+            if existing is not None:
+                return jsonify(existing), 200
+        release_reservation(reservation_id)
+        logger.error(f'Failed to save order, released reservation {reservation_id}: {str(e)}')
+        return jsonify({'error': 'Failed to save order'}), 500
+    
+    order_data = {
+        'id': order_id,
+        'customer_id': data['customer_id'],
+        'product_id': lines[0]['product_id'],
+        'product_name': lines[0]['product_name'],
+        'quantity': total_quantity,
+        'total_price': total_price,
+        'status': 'PENDING',
+        'items': lines,
+        'message': 'Order created successfully'
+    }
+    
+    return jsonify(order_data), 201
 
 @app.route('/orders/<int:order_id>', methods=['GET'])
 def get_order(order_id):
     """Get order details by ID"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        'SELECT id, customer_id, product_id, product_name, quantity, total_price, status, created_at FROM orders WHERE id = ?',
-        (order_id,)
-    )
-    row = cursor.fetchone()
-    conn.close()
-    
-    if row:
-        order = {
-            'id': row[0],
-            'customer_id': row[1],
-            'product_id': row[2],
-            'product_name': row[3],
-            'quantity': row[4],
-            'total_price': row[5],
-            'status': row[6],
-            'created_at': row[7]
-        }
+    order = db.query_one(f'SELECT {ORDER_COLUMNS} FROM orders WHERE id = ?', (order_id,))
+    
+    if order:
+        order['items'] = db.query(
+            f'SELECT {LINE_COLUMNS} FROM order_lines WHERE order_id = ? ORDER BY id', (order_id,))
         return jsonify(order), 200
     else:
         return jsonify({'error': 'Order not found'}), 404
@@ -131,25 +250,18 @@ def get_order(order_id):
 @app.route('/orders/customer/<int:customer_id>', methods=['GET'])
 def get_customer_orders(customer_id):
     """Get all orders for a specific customer"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        'SELECT id, customer_id, product_id, product_name, quantity, total_price, status, created_at FROM orders WHERE customer_id = ?',
-        (customer_id,)
-    )
-    orders = []
-    for row in cursor.fetchall():
-        orders.append({
-            'id': row[0],
-            'customer_id': row[1],
-            'product_id': row[2],
-            'product_name': row[3],
-            'quantity': row[4],
-            'total_price': row[5],
-            'status': row[6],
-            'created_at': row[7]
-        })
-    conn.close()
+    orders = db.query(f'SELECT {ORDER_COLUMNS} FROM orders WHERE customer_id = ?', (customer_id,))
+    
+    # Fetch the lines of all these orders in one query rather than one per order
+    lines_by_order = {order['id']: [] for order in orders}
+    for line in db.query(
+            f'''SELECT order_id, {LINE_COLUMNS} FROM order_lines
+                WHERE order_id IN (SELECT id FROM orders WHERE customer_id = ?) ORDER BY id''',
+            (customer_id,)):
+        lines_by_order.setdefault(line.pop('order_id'), []).append(line)
+    for order in orders:
+        order['items'] = lines_by_order[order['id']]
+    
     return jsonify(orders), 200
 
 @app.route('/orders/<int:order_id>/status', methods=['PUT'])
@@ -164,17 +276,11 @@ def update_order_status(order_id):
     if data['status'] not in valid_statuses:
         return jsonify({'error': 'Invalid status', 'valid_statuses': valid_statuses}), 400
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('UPDATE orders SET status = ? WHERE id = ?', (data['status'], order_id))
+    cursor = db.execute('UPDATE orders SET status = ? WHERE id = ?', (data['status'], order_id))
     
     if cursor.rowcount == 0:
-        conn.close()
         return jsonify({'error': 'Order not found'}), 404
     
-    conn.commit()
-    conn.close()
-    
     return jsonify({'message': 'Order status updated successfully', 'status': data['status']}), 200
 
 if __name__ == '__main__':
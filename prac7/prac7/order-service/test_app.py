@@ -0,0 +1,195 @@
+import threading
+import pytest
+import requests
+import app as app_module
+from app import app
+from shared.db import Database
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload or {}
+
+    def json(self):
+        return self.payload
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f'HTTP {self.status_code}')
+
+
+class FakeProductService:
+    """Stands in for the Product Service session, recording reserve and release calls"""
+
+    def __init__(self):
+        self.stock = {}
+        self.prices = {}
+        self.reserved = {}
+        self.released = []
+        self.fail_reserve = None
+
+    def post(self, url, json=None, timeout=None):
+        if url.endswith('/release'):
+            self.released.append(url.split('/')[-2])
+            return FakeResponse(200)
+        # All or nothing, like Product Service
+        for item in json['items']:
+            if item['quantity'] > self.stock.get(item['product_id'], 100):
+                return FakeResponse(400, {'error': 'Insufficient stock',
+                                          'product_id': item['product_id']})
+        self.reserved[json['reservation_id']] = json['items']
+        if self.fail_reserve:
+            raise self.fail_reserve
+        return FakeResponse(200, {'items': [
+            dict(item, name=f"Product {item['product_id']}",
+                 price=self.prices.get(item['product_id'], 10.0), new_stock=1)
+            for item in json['items']]})
+
+
+@pytest.fixture
+def products(monkeypatch):
+    fake = FakeProductService()
+    monkeypatch.setattr(app_module, 'product_session', lambda: fake)
+    return fake
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    db = Database(str(tmp_path / 'orders.db'))
+    monkeypatch.setattr(app_module, 'db', db)
+    app_module.init_db()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+    db.close()
+
+
+ORDER = {'customer_id': 1, 'items': [{'product_id': 1, 'quantity': 2}]}
+
+
+def test_each_thread_gets_its_own_session_on_one_adapter():
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.append(app_module.product_session()))
+    thread.start()
+    thread.join()
+    sessions.append(app_module.product_session())
+
+    assert sessions[0] is not sessions[1]
+    assert app_module.product_session() is sessions[1]
+    assert all(s.get_adapter('http://product-service') is app_module.product_adapter
+               for s in sessions)
+
+
+def test_order_is_saved_with_its_reservation(client, products):
+    response = client.post('/orders', json=ORDER)
+    assert response.status_code == 201
+    assert response.get_json()['total_price'] == 20.0
+    assert len(products.reserved) == 1
+    assert products.released == []
+
+
+CART = {'customer_id': 7, 'items': [
+    {'product_id': 1, 'quantity': 2},
+    {'product_id': 3, 'quantity': 1},
+    {'product_id': 4, 'quantity': 3}
+]}
+EXPECTED_LINES = [
+    {'product_id': 1, 'product_name': 'Product 1', 'quantity': 2, 'unit_price': 999.99, 'line_total': 1999.98},
+    {'product_id': 3, 'product_name': 'Product 3', 'quantity': 1, 'unit_price': 199.99, 'line_total': 199.99},
+    {'product_id': 4, 'product_name': 'Product 4', 'quantity': 3, 'unit_price': 449.99, 'line_total': 1349.97},
+]
+
+
+def test_multi_line_order(client, products):
+    products.prices = {1: 999.99, 3: 199.99, 4: 449.99}
+    response = client.post('/orders', json=CART)
+
+    assert response.status_code == 201
+    order = response.get_json()
+    assert order['total_price'] == pytest.approx(3549.94)
+    assert order['quantity'] == 6
+    assert (order['product_id'], order['product_name']) == (1, 'Product 1')
+    assert order['items'] == EXPECTED_LINES
+
+    stored = app_module.db.query(
+        'SELECT order_id, product_id, product_name, quantity, unit_price, line_total '
+        'FROM order_lines ORDER BY id')
+    assert stored == [dict(line, order_id=order['id']) for line in EXPECTED_LINES]
+
+    fetched = client.get(f"/orders/{order['id']}").get_json()
+    assert fetched['items'] == EXPECTED_LINES
+    assert fetched['total_price'] == pytest.approx(3549.94)
+    by_customer = client.get('/orders/customer/7').get_json()
+    assert [o['id'] for o in by_customer] == [order['id']]
+    assert by_customer[0]['items'] == EXPECTED_LINES
+
+
+def test_one_short_line_fails_the_whole_order(client, products):
+    products.stock = {3: 0}
+    response = client.post('/orders', json=CART)
+
+    assert response.status_code == 400
+    assert response.get_json()['product_id'] == 3
+    assert products.reserved == {}
+    assert app_module.db.query('SELECT id FROM orders') == []
+    assert app_module.db.query('SELECT id FROM order_lines') == []
+    assert client.get('/orders/customer/7').get_json() == []
+
+
+def test_retry_with_idempotency_key_reserves_once(client, products):
+    headers = {'Idempotency-Key': 'checkout-42'}
+    first = client.post('/orders', json=ORDER, headers=headers)
+    retry = client.post('/orders', json=ORDER, headers=headers)
+
+    assert first.status_code == 201
+    assert retry.status_code == 200
+    assert retry.get_json()['id'] == first.get_json()['id']
+    assert list(products.reserved) == ['checkout-42']
+    assert len(client.get('/orders/customer/1').get_json()) == 1
+
+
+def test_product_service_timeout_releases_the_reservation(client, products):
+    products.fail_reserve = requests.exceptions.ReadTimeout('read timed out')
+    response = client.post('/orders', json=ORDER)
+
+    assert response.status_code == 500
+    assert products.released == list(products.reserved)
+
+
+def test_failed_order_insert_releases_the_reservation(client, products, monkeypatch):
+    def broken_transaction():
+        raise RuntimeError('disk I/O error')
+    monkeypatch.setattr(app_module.db, 'transaction', broken_transaction)
+    response = client.post('/orders', json=ORDER)
+
+    assert response.status_code == 500
+    assert products.released == list(products.reserved)
+
+
+def test_backfill_gives_legacy_orders_a_line(tmp_path, monkeypatch):
+    db = Database(str(tmp_path / 'legacy.db'))
+    monkeypatch.setattr(app_module, 'db', db)
+    db.executescript('''
+        CREATE TABLE orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            product_name TEXT NOT NULL,
+            quantity INTEGER NOT NULL,
+            total_price REAL NOT NULL,
+            status TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        );
+        INSERT INTO orders (customer_id, product_id, product_name, quantity, total_price, status, created_at)
+        VALUES (1, 1, 'Laptop', 2, 20.0, 'PENDING', '2024-01-01'),
+               (1, 2, 'Tablet', 0, 5.0, 'CANCELLED', '2024-01-02');
+    ''')
+    app_module.init_db()
+
+    lines = db.query('SELECT order_id, quantity, unit_price, line_total FROM order_lines ORDER BY order_id')
+    assert lines == [
+        {'order_id': 1, 'quantity': 2, 'unit_price': 10.0, 'line_total': 20.0},
+        {'order_id': 2, 'quantity': 0, 'unit_price': 5.0, 'line_total': 5.0},
+    ]
+    db.close()
@@ -1,15 +1,22 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import sqlite3
 import requests
 import os
+import sys
 from datetime import datetime
 import random
 
+# The shared package sits next to app.py in the image and one level up in the repo
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared.db import Database
+
 app = Flask(__name__)
 CORS(app)
 
 DB_PATH = 'payments.db'
+db = Database(DB_PATH)
+
+PAYMENT_COLUMNS = 'id, order_id, customer_id, amount, payment_method, payment_gateway, transaction_id, status, created_at'
 ORDER_SERVICE_URL = os.environ.get('ORDER_SERVICE_URL', 'http://order-service:5002')
 
 # Simulated payment gateways
@@ -17,10 +24,7 @@ PAYMENT_GATEWAYS = ['Stripe', 'PayPal', 'Razorpay', 'Square']
 
 def init_db():
     """Initialize the payments database"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
+    db.execute('''
         CREATE TABLE IF NOT EXISTS payments (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             order_id INTEGER NOT NULL,
@@ -33,9 +37,6 @@ def init_db():
             created_at TEXT NOT NULL
         )
     ''')
-    
-    conn.commit()
-    conn.close()
 
 @app.route('/health', methods=['GET'])
 def health():
@@ -78,17 +79,13 @@ def process_payment():
     
     if payment_success:
         # Store payment record
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
+        cursor = db.execute(
             '''INSERT INTO payments (order_id, customer_id, amount, payment_method, payment_gateway, transaction_id, status, created_at)
                VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
             (data['order_id'], data['customer_id'], data['amount'], 
              data['payment_method'], payment_gateway, transaction_id, 'SUCCESS', datetime.now().isoformat())
         )
         payment_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
         
         # Update order status in Order Service (synchronous call)
         try:
@@ -113,17 +110,13 @@ def process_payment():
         }), 201
     else:
         # Payment failed
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute(
+        cursor = db.execute(
             '''INSERT INTO payments (order_id, customer_id, amount, payment_method, payment_gateway, transaction_id, status, created_at)
                VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
             (data['order_id'], data['customer_id'], data['amount'], 
              data['payment_method'], payment_gateway, transaction_id, 'FAILED', datetime.now().isoformat())
         )
         payment_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
         
         return jsonify({
             'id': payment_id,
@@ -140,27 +133,9 @@ def process_payment():
 @app.route('/payments/<int:payment_id>', methods=['GET'])
 def get_payment(payment_id):
     """Get payment details by ID"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        'SELECT id, order_id, customer_id, amount, payment_method, payment_gateway, transaction_id, status, created_at FROM payments WHERE id = ?',
-        (payment_id,)
-    )
-    row = cursor.fetchone()
-    conn.close()
+    payment = db.query_one(f'SELECT {PAYMENT_COLUMNS} FROM payments WHERE id = ?', (payment_id,))
     
-    if row:
-        payment = {
-            'id': row[0],
-            'order_id': row[1],
-            'customer_id': row[2],
-            'amount': row[3],
-            'payment_method': row[4],
-            'payment_gateway': row[5],
-            'transaction_id': row[6],
-            'status': row[7],
-            'created_at': row[8]
-        }
+    if payment:
         return jsonify(payment), 200
     else:
         return jsonify({'error': 'Payment not found'}), 404
@@ -168,77 +143,35 @@ def get_payment(payment_id):
 @app.route('/payments/order/<int:order_id>', methods=['GET'])
 def get_payments_by_order(order_id):
     """Get all payment attempts for an order"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        'SELECT id, order_id, customer_id, amount, payment_method, payment_gateway, transaction_id, status, created_at FROM payments WHERE order_id = ?',
-        (order_id,)
-    )
-    payments = []
-    for row in cursor.fetchall():
-        payments.append({
-            'id': row[0],
-            'order_id': row[1],
-            'customer_id': row[2],
-            'amount': row[3],
-            'payment_method': row[4],
-            'payment_gateway': row[5],
-            'transaction_id': row[6],
-            'status': row[7],
-            'created_at': row[8]
-        })
-    conn.close()
+    payments = db.query(f'SELECT {PAYMENT_COLUMNS} FROM payments WHERE order_id = ?', (order_id,))
     return jsonify(payments), 200
 
 @app.route('/payments/customer/<int:customer_id>', methods=['GET'])
 def get_payments_by_customer(customer_id):
     """Get all payments for a customer"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        'SELECT id, order_id, customer_id, amount, payment_method, payment_gateway, transaction_id, status, created_at FROM payments WHERE customer_id = ?',
-        (customer_id,)
-    )
-    payments = []
-    for row in cursor.fetchall():
-        payments.append({
-            'id': row[0],
-            'order_id': row[1],
-            'customer_id': row[2],
-            'amount': row[3],
-            'payment_method': row[4],
-            'payment_gateway': row[5],
-            'transaction_id': row[6],
-            'status': row[7],
-            'created_at': row[8]
-        })
-    conn.close()
+    payments = db.query(f'SELECT {PAYMENT_COLUMNS} FROM payments WHERE customer_id = ?', (customer_id,))
     return jsonify(payments), 200
 
 @app.route('/payments/<int:payment_id>/refund', methods=['POST'])
 def refund_payment(payment_id):
     """Process a refund for a payment"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Get payment details
-    cursor.execute('SELECT status, amount, order_id FROM payments WHERE id = ?', (payment_id,))
-    row = cursor.fetchone()
-    
-    if not row:
-        conn.close()
-        return jsonify({'error': 'Payment not found'}), 404
-    
-    status, amount, order_id = row
-    
-    if status != 'SUCCESS':
-        conn.close()
-        return jsonify({'error': 'Can only refund successful payments'}), 400
-    
-    # Update payment status to REFUNDED
-    cursor.execute('UPDATE payments SET status = ? WHERE id = ?', ('REFUNDED', payment_id))
-    conn.commit()
-    conn.close()
+    with db.transaction() as conn:
+        cursor = conn.cursor()
+        
+        # Get payment details
+        cursor.execute('SELECT status, amount, order_id FROM payments WHERE id = ?', (payment_id,))
+        row = cursor.fetchone()
+        
+        if not row:
+            return jsonify({'error': 'Payment not found'}), 404
+        
+        status, amount, order_id = row
+        
+        if status != 'SUCCESS':
+            return jsonify({'error': 'Can only refund successful payments'}), 400
+        
+        # Update payment status to REFUNDED
+        cursor.execute('UPDATE payments SET status = ? WHERE id = ?', ('REFUNDED', payment_id))
     
     # Update order status back to PENDING
     try:
@@ -1,86 +1,192 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import sqlite3
 import os
+import sys
+import threading
+import uuid
+import json
+from datetime import datetime
+
+# The shared package sits next to app.py in the image and one level up in the repo
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared.db import Database, rows_to_dicts
 
 app = Flask(__name__)
 CORS(app)
 
 DB_PATH = 'products.db'
+db = Database(DB_PATH)
+
+PRODUCT_COLUMNS = 'id, name, description, price, stock'
+
+class CatalogCache:
+    """Read-through in-memory copy of the products table.
+    
+    The whole catalog is loaded on first read. This service is the only
+    writer of products.db, so writes keep the copy current (put/set_stock)
+    instead of expiring it, and every change bumps the version used as the
+    listing's ETag. Cached product dicts are replaced, never mutated, so a
+    response being serialized never sees a half-applied update.
+    
+    Writers hold write_lock across their transaction and the cache update
+    that follows its commit, so updates reach the cache in commit order.
+    """
+    def __init__(self, load):
+        self._load = load
+        self._lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self._products = None
+        self._version = 0
+        # Distinguishes ETags issued before and after a restart
+        self._instance = uuid.uuid4().hex[:8]
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.not_modified = 0
+    
+    def _ensure_loaded(self):
+        """Return the cached products by id, loading them on a miss"""
+        with self._lock:
+            if self._products is not None:
+                self.hits += 1
+                return self._products, self._version
+            self.misses += 1
+            version = self._version
+        
+        products = {product['id']: product for product in self._load()}
+        with self._lock:
+            # A write that landed while loading may be missing from this
+            # snapshot; serve it once but do not keep it.
+            if self._version == version:
+                self._products = products
+                self.loads += 1
+            return products, version
+    
+    def etag(self, version):
+        return f'catalog-{self._instance}-{version}'
+    
+    def listing(self):
+        """Return (all products, ETag)"""
+        products, version = self._ensure_loaded()
+        return list(products.values()), self.etag(version)
+    
+    def get(self, product_id):
+        products, _ = self._ensure_loaded()
+        return products.get(product_id)
+    
+    def put(self, product):
+        """Add or replace one product after it was written"""
+        with self._lock:
+            self._version += 1
+            if self._products is not None:
+                self._products = dict(self._products)
+                self._products[product['id']] = product
+    
+    def set_stock(self, product_id, stock):
+        """Record a committed stock change"""
+        with self._lock:
+            self._version += 1
+            if self._products is not None and product_id in self._products:
+                self._products = dict(self._products)
+                self._products[product_id] = dict(self._products[product_id], stock=stock)
+    
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+    
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._products = None
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'loads': self.loads,
+                'not_modified': self.not_modified,
+                'size': len(self._products) if self._products is not None else 0,
+                'version': self._version
+            }
+
+catalog = CatalogCache(lambda: db.query(f'SELECT {PRODUCT_COLUMNS} FROM products ORDER BY id'))
 
 def init_db():
     """Initialize the database with sample products"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS products (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            description TEXT,
-            price REAL NOT NULL,
-            stock INTEGER NOT NULL
-        )
-    ''')
-    
-    # Check if table is empty and add sample data
-    cursor.execute('SELECT COUNT(*) FROM products')
-    if cursor.fetchone()[0] == 0:
-        sample_products = [
-            ('Laptop', 'High-performance laptop', 999.99, 10),
-            ('Smartphone', 'Latest smartphone model', 699.99, 25),
-            ('Headphones', 'Wireless noise-cancelling headphones', 199.99, 50),
-            ('Tablet', '10-inch tablet with stylus', 449.99, 15),
-            ('Smart Watch', 'Fitness tracking smartwatch', 299.99, 30)
-        ]
-        cursor.executemany(
-            'INSERT INTO products (name, description, price, stock) VALUES (?, ?, ?, ?)',
-            sample_products
-        )
-    
-    conn.commit()
-    conn.close()
+    with db.transaction() as conn:
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS products (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                description TEXT,
+                price REAL NOT NULL,
+                stock INTEGER NOT NULL
+            )
+        ''')
+        
+        # One row per reservation_id sent to /products/reserve, so a repeated
+        # reserve is answered from here instead of taking stock again and a
+        # release knows what to put back
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS reservations (
+                id TEXT PRIMARY KEY,
+                items TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        ''')
+        
+        # Check if table is empty and add sample data
+        cursor.execute('SELECT COUNT(*) FROM products')
+        if cursor.fetchone()[0] == 0:
+            sample_products = [
+                ('Laptop', 'High-performance laptop', 999.99, 10),
+                ('Smartphone', 'Latest smartphone model', 699.99, 25),
+                ('Headphones', 'Wireless noise-cancelling headphones', 199.99, 50),
+                ('Tablet', '10-inch tablet with stylus', 449.99, 15),
+                ('Smart Watch', 'Fitness tracking smartwatch', 299.99, 30)
+            ]
+            cursor.executemany(
+                'INSERT INTO products (name, description, price, stock) VALUES (?, ?, ?, ?)',
+                sample_products
+            )
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
     return jsonify({'status': 'healthy', 'service': 'product-service'}), 200
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Catalog cache and connection pool statistics"""
+    return jsonify({'catalog_cache': catalog.stats(), 'db_pool': db.stats()}), 200
+
 @app.route('/products', methods=['GET'])
 def get_products():
     """Get all products"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, name, description, price, stock FROM products')
-    products = []
-    for row in cursor.fetchall():
-        products.append({
-            'id': row[0],
-            'name': row[1],
-            'description': row[2],
-            'price': row[3],
-            'stock': row[4]
-        })
-    conn.close()
-    return jsonify(products), 200
+    products, etag = catalog.listing()
+    
+    if request.if_none_match.contains_weak(etag):
+        catalog.record_not_modified()
+        response = app.response_class(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+    
+    response = jsonify(products)
+    response.set_etag(etag, weak=True)
+    return response, 200
 
 @app.route('/products/<int:product_id>', methods=['GET'])
 def get_product(product_id):
     """Get a specific product by ID"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, name, description, price, stock FROM products WHERE id = ?', (product_id,))
-    row = cursor.fetchone()
-    conn.close()
-    
-    if row:
-        product = {
-            'id': row[0],
-            'name': row[1],
-            'description': row[2],
-            'price': row[3],
-            'stock': row[4]
-        }
+    product = catalog.get(product_id)
+    
+    if product:
         return jsonify(product), 200
     else:
         return jsonify({'error': 'Product not found'}), 404
@@ -93,49 +199,199 @@ def create_product():
     if not all(k in data for k in ('name', 'price', 'stock')):
         return jsonify({'error': 'Missing required fields'}), 400
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    cursor.execute(
-        'INSERT INTO products (name, description, price, stock) VALUES (?, ?, ?, ?)',
-        (data['name'], data.get('description', ''), data['price'], data['stock'])
-    )
-    product_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    with catalog.write_lock:
+        product = db.query_one(
+            f'INSERT INTO products (name, description, price, stock) VALUES (?, ?, ?, ?) RETURNING {PRODUCT_COLUMNS}',
+            (data['name'], data.get('description', ''), data['price'], data['stock'])
+        )
+        catalog.put(product)
+    
+    return jsonify({'id': product['id'], 'message': 'Product created successfully'}), 201
+
+def is_positive_int(value):
+    """True for a positive JSON integer; bool is an int subclass, so true/false are rejected explicitly"""
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+class ReservationFailed(Exception):
+    """Raised inside a reservation transaction to roll it back"""
+    def __init__(self, body, status):
+        super().__init__(body['error'])
+        self.body = body
+        self.status = status
+
+def reserve_stock(conn, product_id, quantity):
+    """Take quantity units of a product in one conditional UPDATE.
     
-    return jsonify({'id': product_id, 'message': 'Product created successfully'}), 201
+    Returns the product's name, price and remaining stock, or None when no
+    row was updated because the product does not exist or has too little
+    stock left.
+    """
+    rows = rows_to_dicts(conn.execute(
+        'UPDATE products SET stock = stock - ? WHERE id = ? AND stock >= ? RETURNING name, price, stock',
+        (quantity, product_id, quantity)
+    ))
+    return rows[0] if rows else None
+
+def reservation_failure(conn, product_id, quantity):
+    """Explain why reserve_stock updated nothing"""
+    row = conn.execute('SELECT stock FROM products WHERE id = ?', (product_id,)).fetchone()
+    if not row:
+        return ReservationFailed({'error': 'Product not found', 'product_id': product_id}, 404)
+    return ReservationFailed({
+        'error': 'Insufficient stock',
+        'product_id': product_id,
+        'available': row[0],
+        'requested': quantity
+    }, 400)
 
 @app.route('/products/<int:product_id>/stock', methods=['PUT'])
 def update_stock(product_id):
     """Update product stock (used by Order Service)"""
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     
     if 'quantity' not in data:
         return jsonify({'error': 'Missing quantity field'}), 400
+    if not is_positive_int(data['quantity']):
+        return jsonify({'error': 'quantity must be a positive integer'}), 400
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with catalog.write_lock:
+        with db.transaction() as conn:
+            reserved = reserve_stock(conn, product_id, data['quantity'])
+            if reserved is None:
+                failure = reservation_failure(conn, product_id, data['quantity'])
+                return jsonify(failure.body), failure.status
+        catalog.set_stock(product_id, reserved['stock'])
     
-    # Check current stock
-    cursor.execute('SELECT stock FROM products WHERE id = ?', (product_id,))
-    row = cursor.fetchone()
+    return jsonify({'message': 'Stock updated successfully', 'new_stock': reserved['stock']}), 200
+
+@app.route('/products/<int:product_id>/reserve', methods=['POST'])
+def reserve_product(product_id):
+    """Reserve stock and return the product's name and unit price in one call (used by Order Service)"""
+    data = request.get_json(silent=True) or {}
+    quantity = data.get('quantity')
     
-    if not row:
-        conn.close()
-        return jsonify({'error': 'Product not found'}), 404
+    if not is_positive_int(quantity):
+        return jsonify({'error': 'Quantity must be a positive integer'}), 400
     
-    current_stock = row[0]
-    new_stock = current_stock - data['quantity']
+    with catalog.write_lock:
+        with db.transaction() as conn:
+            reserved = reserve_stock(conn, product_id, quantity)
+            if reserved is None:
+                failure = reservation_failure(conn, product_id, quantity)
+                return jsonify(failure.body), failure.status
+        catalog.set_stock(product_id, reserved['stock'])
     
-    if new_stock < 0:
-        conn.close()
-        return jsonify({'error': 'Insufficient stock', 'available': current_stock}), 400
+    return jsonify({
+        'product_id': product_id,
+        'name': reserved['name'],
+        'price': reserved['price'],
+        'quantity': quantity,
+        'new_stock': reserved['stock']
+    }), 200
+
+def parse_reservation_items(data):
+    """Validate a list of {product_id, quantity} items, returning an error message or None"""
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return 'Expected a non-empty items list'
+    for item in items:
+        if not isinstance(item, dict) or not all(k in item for k in ('product_id', 'quantity')):
+            return 'Each item needs product_id and quantity'
+        if not is_positive_int(item['quantity']):
+            return 'Quantities must be positive integers'
+    if not isinstance(data.get('reservation_id', ''), str):
+        return 'reservation_id must be a string'
+    return None
+
+@app.route('/products/reserve', methods=['POST'])
+def reserve_products():
+    """Reserve stock for several products at once, all or nothing.
+    
+    With a reservation_id the call is idempotent: repeating it returns the
+    first answer without taking stock again, so a caller that timed out can
+    retry safely, and the id can later be passed to the release endpoint.
+    """
+    data = request.get_json(silent=True)
+    error = parse_reservation_items(data)
+    if error:
+        return jsonify({'error': error}), 400
+    reservation_id = data.get('reservation_id')
+    
+    reserved = []
+    try:
+        with catalog.write_lock:
+            with db.transaction() as conn:
+                if reservation_id is not None:
+                    existing = conn.execute(
+                        'SELECT items, status FROM reservations WHERE id = ?', (reservation_id,)
+                    ).fetchone()
+                    if existing and existing[1] == 'RELEASED':
+                        raise ReservationFailed({'error': 'Reservation was released',
+                                                 'reservation_id': reservation_id}, 409)
+                    if existing:
+                        return jsonify({'message': 'Stock already reserved',
+                                        'reservation_id': reservation_id,
+                                        'items': json.loads(existing[0])}), 200
+                for item in data['items']:
+                    product = reserve_stock(conn, item['product_id'], item['quantity'])
+                    if product is None:
+                        raise reservation_failure(conn, item['product_id'], item['quantity'])
+                    reserved.append({
+                        'product_id': item['product_id'],
+                        'name': product['name'],
+                        'price': product['price'],
+                        'quantity': item['quantity'],
+                        'new_stock': product['stock']
+                    })
+                if reservation_id is not None:
+                    conn.execute(
+                        'INSERT INTO reservations (id, items, status, created_at) VALUES (?, ?, ?, ?)',
+                        (reservation_id, json.dumps(reserved), 'RESERVED', datetime.now().isoformat())
+                    )
+            for item in reserved:
+                catalog.set_stock(item['product_id'], item['new_stock'])
+    except ReservationFailed as e:
+        return jsonify(e.body), e.status
+    
+    return jsonify({'message': 'Stock reserved successfully', 'reservation_id': reservation_id,
+                    'items': reserved}), 200
+
+@app.route('/products/reservations/<reservation_id>/release', methods=['POST'])
+def release_reservation(reservation_id):
+    """Put a reservation's stock back (used by Order Service when an order cannot be saved).
     
-    cursor.execute('UPDATE products SET stock = ? WHERE id = ?', (new_stock, product_id))
-    conn.commit()
-    conn.close()
+    Releasing twice is harmless. Releasing an id that was never reserved
+    records it as released, so a reserve call still in flight with that id
+    is refused when it arrives instead of taking stock nobody will use.
+    """
+    restocked = []
+    with catalog.write_lock:
+        with db.transaction() as conn:
+            existing = conn.execute(
+                'SELECT items, status FROM reservations WHERE id = ?', (reservation_id,)
+            ).fetchone()
+            if existing is None:
+                conn.execute(
+                    'INSERT INTO reservations (id, items, status, created_at) VALUES (?, ?, ?, ?)',
+                    (reservation_id, '[]', 'RELEASED', datetime.now().isoformat())
+                )
+            elif existing[1] == 'RESERVED':
+                for item in json.loads(existing[0]):
+                    rows = rows_to_dicts(conn.execute(
+                        'UPDATE products SET stock = stock + ? WHERE id = ? RETURNING stock',
+                        (item['quantity'], item['product_id'])
+                    ))
+                    if rows:
+                        restocked.append({'product_id': item['product_id'],
+                                          'quantity': item['quantity'],
+                                          'new_stock': rows[0]['stock']})
+                conn.execute("UPDATE reservations SET status = 'RELEASED' WHERE id = ?",
+                             (reservation_id,))
+        for item in restocked:
+            catalog.set_stock(item['product_id'], item['new_stock'])
     
-    return jsonify({'message': 'Stock updated successfully', 'new_stock': new_stock}), 200
+    return jsonify({'message': 'Reservation released', 'reservation_id': reservation_id,
+                    'items': restocked}), 200
 
 if __name__ == '__main__':
     init_db()
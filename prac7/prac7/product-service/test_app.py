@@ -0,0 +1,191 @@
+import threading
+import pytest
+import app as app_module
+from app import app, CatalogCache, PRODUCT_COLUMNS
+from shared.db import Database
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    db = Database(str(tmp_path / 'products.db'))
+    monkeypatch.setattr(app_module, 'db', db)
+    monkeypatch.setattr(app_module, 'catalog', CatalogCache(
+        lambda: db.query(f'SELECT {PRODUCT_COLUMNS} FROM products ORDER BY id')))
+    app_module.init_db()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+    db.close()
+
+
+def create_product(client, stock):
+    response = client.post('/products', json={'name': 'Widget', 'price': 2.5, 'stock': stock})
+    return response.get_json()['id']
+
+
+@pytest.mark.parametrize('quantity', [True, False, 0, -1, 1.5, '1', None])
+def test_reserve_rejects_non_positive_integers(client, quantity):
+    response = client.post('/products/1/reserve', json={'quantity': quantity})
+    assert response.status_code == 400
+    response = client.post('/products/reserve',
+                           json={'items': [{'product_id': 1, 'quantity': quantity}]})
+    assert response.status_code == 400
+    assert client.get('/products/1').get_json()['stock'] == 10
+
+
+@pytest.mark.parametrize('quantity', [-5, 1.5, True, '3', None])
+def test_update_stock_rejects_non_positive_integers(client, quantity):
+    response = client.put('/products/1/stock', json={'quantity': quantity})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'quantity must be a positive integer'
+    stored = app_module.db.query_one('SELECT stock, typeof(stock) AS kind FROM products WHERE id = 1')
+    assert stored == {'stock': 10, 'kind': 'integer'}
+
+
+def test_update_stock_requires_quantity(client):
+    response = client.put('/products/1/stock', json={})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Missing quantity field'
+
+
+def test_update_stock_takes_stock(client):
+    response = client.put('/products/1/stock', json={'quantity': 4})
+    assert response.status_code == 200
+    assert response.get_json()['new_stock'] == 6
+
+
+def test_bulk_reserve_is_all_or_nothing(client):
+    response = client.post('/products/reserve', json={'items': [
+        {'product_id': 1, 'quantity': 2},
+        {'product_id': 2, 'quantity': 1000}
+    ]})
+    assert response.status_code == 400
+    assert response.get_json()['product_id'] == 2
+    assert client.get('/products/1').get_json()['stock'] == 10
+
+
+def test_concurrent_reserves_never_oversell(client):
+    product_id = create_product(client, stock=50)
+    statuses = []
+    lock = threading.Lock()
+    start = threading.Barrier(80)
+
+    def reserve():
+        with app.test_client() as own_client:
+            start.wait()
+            response = own_client.post(f'/products/{product_id}/reserve', json={'quantity': 1})
+        with lock:
+            statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=reserve) for _ in range(80)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert statuses.count(200) == 50
+    assert statuses.count(400) == 30
+    assert client.get(f'/products/{product_id}').get_json()['stock'] == 0
+    stored = app_module.db.query_one('SELECT stock FROM products WHERE id = ?', (product_id,))
+    assert stored['stock'] == 0
+
+
+def test_reserve_with_reservation_id_is_idempotent(client):
+    request = {'reservation_id': 'order-1', 'items': [{'product_id': 1, 'quantity': 3}]}
+    first = client.post('/products/reserve', json=request)
+    retry = client.post('/products/reserve', json=request)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.get_json()['items'] == first.get_json()['items']
+    assert client.get('/products/1').get_json()['stock'] == 7
+
+
+def test_release_puts_stock_back_once(client):
+    client.post('/products/reserve', json={'reservation_id': 'order-1', 'items': [
+        {'product_id': 1, 'quantity': 3}, {'product_id': 2, 'quantity': 5}]})
+
+    for _ in range(2):
+        response = client.post('/products/reservations/order-1/release')
+        assert response.status_code == 200
+    assert client.get('/products/1').get_json()['stock'] == 10
+    assert client.get('/products/2').get_json()['stock'] == 25
+
+
+def test_release_before_reserve_refuses_the_late_reserve(client):
+    client.post('/products/reservations/order-1/release')
+    response = client.post('/products/reserve', json={
+        'reservation_id': 'order-1', 'items': [{'product_id': 1, 'quantity': 3}]})
+
+    assert response.status_code == 409
+    assert client.get('/products/1').get_json()['stock'] == 10
+
+
+def listing(client, etag=None):
+    return client.get('/products', headers={'If-None-Match': etag} if etag else {})
+
+
+def test_listing_etag_gives_304_with_empty_body(client):
+    first = listing(client)
+    etag = first.headers['ETag']
+    assert first.status_code == 200
+    assert len(first.get_json()) == 5
+
+    second = listing(client, etag)
+    assert second.status_code == 304
+    assert second.get_data() == b''
+    assert second.headers['ETag'] == etag
+
+
+@pytest.mark.parametrize('write', [
+    lambda client: client.post('/products', json={'name': 'Widget', 'price': 2.5, 'stock': 3}),
+    lambda client: client.put('/products/1/stock', json={'quantity': 2}),
+    lambda client: client.post('/products/1/reserve', json={'quantity': 2}),
+    lambda client: client.post('/products/reserve', json={'items': [
+        {'product_id': 1, 'quantity': 1}, {'product_id': 2, 'quantity': 1}]}),
+], ids=['create', 'update_stock', 'reserve', 'batch_reserve'])
+def test_writes_change_the_listing(client, write):
+    before = listing(client)
+    assert write(client).status_code in (200, 201)
+
+    after = listing(client, before.headers['ETag'])
+    assert after.status_code == 200
+    assert after.headers['ETag'] != before.headers['ETag']
+    assert after.get_json() != before.get_json()
+    # The cached listing matches what is stored
+    assert after.get_json() == app_module.db.query(
+        f'SELECT {PRODUCT_COLUMNS} FROM products ORDER BY id')
+
+
+def test_release_changes_the_listing(client):
+    client.post('/products/reserve', json={'reservation_id': 'order-1',
+                                           'items': [{'product_id': 1, 'quantity': 4}]})
+    before = listing(client)
+    client.post('/products/reservations/order-1/release')
+
+    after = listing(client, before.headers['ETag'])
+    assert after.status_code == 200
+    assert after.headers['ETag'] != before.headers['ETag']
+    assert after.get_json()[0]['stock'] == 10
+
+
+def test_metrics_count_cache_hits_and_misses(client):
+    def cache_stats():
+        return client.get('/metrics').get_json()['catalog_cache']
+
+    assert cache_stats()['misses'] == 0
+    etag = listing(client).headers['ETag']
+    stats = cache_stats()
+    assert (stats['hits'], stats['misses'], stats['loads'], stats['size']) == (0, 1, 1, 5)
+
+    listing(client)
+    client.get('/products/1')
+    listing(client, etag)
+    stats = cache_stats()
+    assert (stats['hits'], stats['misses'], stats['loads']) == (3, 1, 1)
+    assert stats['not_modified'] == 1
+    assert stats['hit_ratio'] == 0.75
+
+    # A write updates the cached copy rather than dropping it
+    client.put('/products/1/stock', json={'quantity': 1})
+    client.get('/products/1')
+    assert cache_stats()['loads'] == 1
@@ -0,0 +1,134 @@
+"""Shared SQLite data access for the prac7 services.
+
+Connections are opened once, configured for WAL and kept in a small pool,
+so a request borrows a ready connection (with its prepared-statement cache
+still warm) instead of connecting, running one statement and closing.
+"""
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+def rows_to_dicts(cursor):
+    """Turn the remaining rows of a cursor into dicts, looking the column
+    names up once per statement rather than once per row."""
+    columns = [column[0] for column in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def row_to_dict(cursor):
+    """Fetch one row of a cursor as a dict, or None when there is none.
+
+    The cursor is closed afterwards so its statement is finished (and an
+    INSERT ... RETURNING committed) before the connection goes back to the pool.
+    """
+    row = cursor.fetchone()
+    columns = [column[0] for column in cursor.description]
+    cursor.close()
+    if row is None:
+        return None
+    return dict(zip(columns, row))
+
+
+class Database:
+    """Pool of SQLite connections to one database file.
+
+    Connections run in autocommit mode; use ``transaction()`` to group
+    statements. A connection is only ever used by the thread that borrowed
+    it, so sharing them between the server's request threads is safe.
+    """
+
+    def __init__(self, path, pool_size=8, busy_timeout=5.0, wal=True,
+                 synchronous='NORMAL'):
+        self.path = path
+        self.pool_size = pool_size
+        self.busy_timeout = busy_timeout
+        self.wal = wal
+        self.synchronous = synchronous
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.reused = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                               isolation_level=None, check_same_thread=False)
+        if self.wal:
+            conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection from the pool for the duration of the block."""
+        try:
+            conn = self._idle.get_nowait()
+            with self._lock:
+                self.reused += 1
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """Run the block in one write transaction, committed on success and
+        rolled back on any exception."""
+        with self.connection() as conn:
+            # IMMEDIATE takes the write lock up front, so two transactions
+            # cannot both read and then fail to upgrade to writing.
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def query(self, sql, params=()):
+        """Run a SELECT and return all rows as dicts."""
+        with self.connection() as conn:
+            return rows_to_dicts(conn.execute(sql, params))
+
+    def query_one(self, sql, params=()):
+        """Run a SELECT and return the first row as a dict, or None."""
+        with self.connection() as conn:
+            return row_to_dict(conn.execute(sql, params))
+
+    def execute(self, sql, params=()):
+        """Run one statement in its own transaction and return the cursor,
+        whose ``lastrowid`` and ``rowcount`` stay readable."""
+        with self.connection() as conn:
+            return conn.execute(sql, params)
+
+    def executescript(self, script):
+        with self.connection() as conn:
+            conn.executescript(script)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'path': self.path,
+                'pool_size': self.pool_size,
+                'idle': self._idle.qsize(),
+                'opened': self.opened,
+                'reused': self.reused
+            }
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return